@@ -6,7 +6,7 @@
 import math
 import random
 import re
-from bs4 import BeautifulSoup
+from ODFTree import ODFElement
 from ODPFunctions import units_to_float
 
 class AnimationFactory():
@@ -194,6 +194,14 @@ class AnimationFactory():
                 ["from-top", "from-left", "from-right", "from-bottom"]]
         ]
 
+        self.id_prefix = ""
+        self.anim_count = 0
+
+
+    def start_page(self, id_prefix):
+        # Animation ids are prefixed with the id of their page, so that pages can be
+        #  rendered independently of each other
+        self.id_prefix = id_prefix
         self.anim_count = 0
 
 
@@ -212,7 +220,7 @@ class AnimationFactory():
 
 
     def generate_anim_id(self):
-        anim_id = "a_" + str(self.anim_count)
+        anim_id = self.id_prefix + "a_" + str(self.anim_count)
         self.anim_count += 1
         return anim_id
 
@@ -1401,14 +1409,13 @@ class AnimationFactory():
             anim_dur = anim_data.find({"anim:set"})["smil:dur"]
 
         # Create temporary animation node
-        soup = BeautifulSoup("<anim:par></anim:par", "lxml")
-        new_anim_data = soup.new_tag(self.entrances[effect_choice][1])
-        new_anim_data["smil:dur"] = anim_dur
-        soup.insert(1, new_anim_data)
+        new_anim_node = ODFElement.create(self.entrances[effect_choice][1], {"smil:dur": anim_dur})
+        new_anim_data = ODFElement.create("anim:par")
+        new_anim_data.append(new_anim_node)
 
         # Call appropriate entrance function
         return self.animation_presets.get(effect_name)(\
-            effect_subtype, pres, item_data, soup, begin_at)
+            effect_subtype, pres, item_data, new_anim_data, begin_at)
 
 
     def entrance_fade_in(self, subtype, pres, item_data, anim_data, begin_at):
@@ -2662,14 +2669,13 @@ class AnimationFactory():
             anim_dur = anim_data.find({"anim:set"})["smil:dur"]
 
         # Create temporary animation node
-        soup = BeautifulSoup("<anim:par></anim:par", "lxml")
-        new_anim_data = soup.new_tag(self.exits[effect_choice][1])
-        new_anim_data["smil:dur"] = anim_dur
-        soup.insert(1, new_anim_data)
+        new_anim_node = ODFElement.create(self.exits[effect_choice][1], {"smil:dur": anim_dur})
+        new_anim_data = ODFElement.create("anim:par")
+        new_anim_data.append(new_anim_node)
 
         # Call appropriate exit function
         return self.animation_presets.get(effect_name)(\
-            effect_subtype, pres, item_data, soup, begin_at)
+            effect_subtype, pres, item_data, new_anim_data, begin_at)
 
 
     def exit_fade_out(self, subtype, pres, item_data, anim_data, begin_at):
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import hashlib
+import json
+import math
+import os
+from collections import namedtuple
+from PIL import Image, ImageOps
+
+DPCM = 37.7953
+# Extensions of the formats images can be converted to
+IMAGE_FORMATS = {"webp": ".webp", "avif": ".avif"}
+# Index of the assets of every presentation converted into the data store
+ASSET_INDEX = "asset_index.json"
+EXIF_ORIENTATION = 0x0112
+# Media types (as the presentation's manifest records them) of vector images, which PIL can't
+#  resample
+VECTOR_MEDIA_TYPES = {"image/svg+xml", "image/x-wmf", "image/wmf", "image/x-emf", "image/emf", \
+    "image/x-svm", "application/x-openoffice-wmf", "application/x-openoffice-emf"}
+
+# Image header information - size in pixels (upright, as turned by its EXIF orientation), PIL
+#  format, resolution as an (x, y) tuple (or None if the image doesn't record one), whether it is
+#  animated, and the hash its asset is named by
+ImageInfo = namedtuple("ImageInfo", ["width", "height", "format", "dpi", "animated", \
+    "content_hash"])
+
+class AssetStore():
+
+    def __init__(self, archive, data_store, image_dpi=None, image_format=None):
+        # If image_dpi is given, images are downscaled to that resolution at the size they are
+        #  displayed (and converted to image_format, if that is given too)
+        self.archive = archive
+        self.data_store = data_store
+        self.image_dpi = image_dpi
+        self.image_format = image_format
+        if image_format:
+            Image.init()
+            if image_format.upper() not in Image.SAVE:
+                raise ValueError("PIL can't write " + image_format + " images")
+        # Archive member -> URL of extracted asset, so each member is extracted at most once
+        self.assets = {}
+        # (archive member, size in pixels, crop box) -> URL of the image's derivative
+        self.derivatives = {}
+        # Content hash (and image information) of the assets of this and previous runs, loaded
+        #  from the data store when first needed
+        self.index = None
+        # Keys of the entries added (or completed) since the index was last saved
+        self.new_keys = set()
+
+
+    def close(self):
+        # Merge the entries added by this run into the index in the data store, which other
+        #  processes may have added to since it was loaded
+        if self.new_keys:
+            asset_index = self.load_index()
+            asset_index.update(self.pop_new_entries())
+            AssetStore.write_asset(self.data_store + ASSET_INDEX, \
+                lambda index_out: index_out.write(json.dumps(asset_index).encode()))
+
+
+    def pop_new_entries(self):
+        # Entries added since the last call, which are no longer counted as new - pages rendered
+        #  in worker processes return them to the presentation, to be merged into its index
+        new_entries = {key: self.index[key] for key in self.new_keys}
+        self.new_keys = set()
+        return new_entries
+
+
+    def merge_entries(self, entries):
+        if entries:
+            if self.index is None:
+                self.index = self.load_index()
+            self.index.update(entries)
+            self.new_keys.update(entries)
+
+
+    def load_index(self):
+        try:
+            with open(self.data_store + ASSET_INDEX) as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+
+    def index_key(self, href):
+        # Entries are keyed by the checksum the archive records for the member, so are found
+        #  without reading (or hashing) the member itself. The CRC is too weak to tell apart
+        #  the members of every deck sharing the data store, so the key also holds the deck's
+        #  path and the member's name
+        return self.archive.checksum(href) + ":" + os.path.abspath(self.archive.url) + ":" + href
+
+
+    def index_entry(self, href):
+        if self.index is None:
+            self.index = self.load_index()
+        key = self.index_key(href)
+        if key not in self.index:
+            self.index[key] = {"hash": hashlib.sha1(self.archive.read(href)).hexdigest()}
+            self.new_keys.add(key)
+        return self.index[key]
+
+
+    def asset_url(self, href):
+        # Assets are named by a hash of their contents, so identical images (within or across
+        #  presentations) share one file in the data store, which is only written once
+        if href not in self.assets:
+            asset_name = self.index_entry(href)["hash"] + os.path.splitext(href)[1].lower()
+            asset_url = self.data_store + asset_name
+            if not os.path.exists(asset_url):
+                AssetStore.write_asset(asset_url, \
+                    lambda asset_out: asset_out.write(self.archive.read(href)))
+            self.assets[href] = asset_url
+        return self.assets[href]
+
+
+    def image_info(self, href):
+        # Information from the image's header, read from the archive member without decoding
+        #  (or extracting) the image. None if PIL can't read the image
+        entry = self.index_entry(href)
+        if "image" not in entry:
+            try:
+                with self.archive.open(href) as member_file, Image.open(member_file) as img:
+                    dpi = img.info.get("dpi")
+                    if isinstance(dpi, (int, float)):
+                        # Metafiles record one resolution for both axes
+                        dpi = (dpi, dpi)
+                    width, height = img.size
+                    if img.getexif().get(EXIF_ORIENTATION) in [5, 6, 7, 8]:
+                        # Turned by a quarter turn when displayed
+                        width, height = height, width
+                    entry["image"] = [width, height, img.format, \
+                        [float(res) for res in dpi] if dpi else None, \
+                        getattr(img, "is_animated", False)]
+            except OSError:
+                # Not an image PIL can read (e.g. a metafile)
+                entry["image"] = None
+            self.new_keys.add(self.index_key(href))
+        if entry["image"] is None:
+            return None
+        width, height, img_format, dpi, animated = entry["image"]
+        return ImageInfo(width, height, img_format, tuple(dpi) if dpi else None, animated, \
+            entry["hash"])
+
+
+    def is_raster(self, href):
+        # Members the manifest doesn't give a media type for are assumed to be bitmaps, which
+        #  image_derivative still checks PIL can draw
+        media_type = self.archive.media_type(href)
+        if not media_type:
+            return True
+        return media_type.startswith("image/") and media_type not in VECTOR_MEDIA_TYPES
+
+
+    @staticmethod
+    def write_asset(asset_url, write_func):
+        # Write to a temporary file first so that a partially written asset is never mistaken
+        #  for a complete one
+        os.makedirs(os.path.dirname(asset_url) or ".", exist_ok=True)
+        part_url = asset_url + "." + str(os.getpid()) + ".part"
+        with open(part_url, 'wb') as asset_out:
+            write_func(asset_out)
+        os.replace(part_url, asset_url)
+
+
+    def image_url(self, href, size, clip=None):
+        # URL of the image to display at size (in cm), cropped to clip if given (cm from the
+        #  top, right, bottom and left edges, for the image at DPCM pixels per cm). Returns None
+        #  if there is no image_dpi, or the image can't be resized, so the caller should use
+        #  (and clip) the original image
+        if self.image_dpi is None:
+            return None
+        target_px = tuple(max(1, math.ceil(length * self.image_dpi / 2.54)) for length in size)
+        # Pixels cropped from the left, top, right and bottom edges
+        crop_edges = None
+        if clip:
+            crop_edges = tuple(round(clip[edge] * DPCM) for edge in [3, 0, 1, 2])
+        key = (href, target_px, crop_edges)
+        if key not in self.derivatives:
+            self.derivatives[key] = self.image_derivative(href, target_px, crop_edges)
+        return self.derivatives[key]
+
+
+    def image_derivative(self, href, target_px, crop_edges):
+        # Derivatives are named by the source image's hash, crop box, size and format, so are
+        #  shared by every presentation using the data store
+        if not self.is_raster(href):
+            return None
+        info = self.image_info(href)
+        if info is None or info.animated:
+            return None
+        crop_box, crop_size = None, (info.width, info.height)
+        if crop_edges:
+            crop_box = (crop_edges[0], crop_edges[1], info.width - crop_edges[2], \
+                info.height - crop_edges[3])
+            crop_size = (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1])
+            if min(crop_size) <= 0:
+                return None
+        # Images are never scaled up
+        target_px = (min(target_px[0], crop_size[0]), min(target_px[1], crop_size[1]))
+        source_url = self.asset_url(href)
+        if target_px == (info.width, info.height) and not self.image_format:
+            return source_url
+        derivative_name = info.content_hash
+        if crop_edges:
+            derivative_name += "_" + "-".join(str(edge) for edge in crop_edges)
+        derivative_name += "_" + str(target_px[0]) + "x" + str(target_px[1]) + \
+            IMAGE_FORMATS.get(self.image_format, os.path.splitext(source_url)[1])
+        derivative_url = self.data_store + derivative_name
+        if not os.path.exists(derivative_url):
+            save_args = {"quality": 90}
+            derivative_format = (self.image_format or info.format).upper()
+            try:
+                with Image.open(source_url) as img:
+                    # Derivatives are turned upright, as the crop box and size are measured
+                    #  that way, and keep the image's colour profile
+                    if img.info.get("icc_profile"):
+                        save_args["icc_profile"] = img.info["icc_profile"]
+                    source = ImageOps.exif_transpose(img)
+                    if source.mode in ["1", "P"]:
+                        # Palette images are converted so they can be resampled smoothly
+                        source = source.convert("RGBA")
+                    derivative = source.resize(target_px, Image.LANCZOS, box=crop_box)
+            except OSError:
+                # PIL reads the headers of vector images (e.g. metafiles), but can't draw them
+                return None
+            if derivative_format == "JPEG" and derivative.mode not in ["L", "RGB", "CMYK"]:
+                # JPEG has no alpha channel
+                derivative = derivative.convert("RGB")
+            AssetStore.write_asset(derivative_url, lambda asset_out: derivative.save( \
+                asset_out, derivative_format, **save_args))
+        return derivative_url
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import math
+import operator
+import re
+from collections import OrderedDict
+
+# Numbers, $n modifiers, ?fn equation references, names and single character operators
+TOKEN_PATTERN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)' + \
+    r'|\$(\d+)|\?f(\d+)|([A-Za-z_]\w*)|(\S))')
+FUNCTIONS = {"sin": math.sin, "cos": math.cos, "tan": math.tan, "atan": math.atan, \
+    "atan2": math.atan2, "sqrt": math.sqrt, "abs": abs, "min": min, "max": max}
+CONSTANTS = {"pi": math.pi}
+# Names of the viewbox bounds, as indices of [left, top, right, bottom]
+VIEWBOX_NAMES = {"left": 0, "top": 1, "right": 2, "bottom": 3}
+OPERATORS = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+MAX_EQUATION_SETS = 1024
+
+# Compiled formulas are closures taking env, a (modifiers, equation results, viewbox) tuple.
+#  Each parse method returns a (closure, constant value or None) pair, so that constant
+#  sub-expressions are only evaluated once, when compiled
+
+def constant_node(value):
+    return (lambda env: value), value
+
+
+class FormulaParser():
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.tokens = []
+        for number, modifier, reference, name, symbol in TOKEN_PATTERN.findall(formula):
+            if number:
+                # Integers stay integers, so results match Python arithmetic on the formula
+                if number.isdigit():
+                    self.tokens.append(("number", int(number)))
+                else:
+                    self.tokens.append(("number", float(number)))
+            elif modifier:
+                self.tokens.append(("modifier", int(modifier)))
+            elif reference:
+                self.tokens.append(("reference", int(reference)))
+            elif name:
+                self.tokens.append(("name", name))
+            elif symbol:
+                self.tokens.append(("symbol", symbol))
+        self.pos = 0
+        # Indices of the equations this formula refers to
+        self.references = set()
+
+
+    def error(self, message):
+        return ValueError(message + " in formula: " + self.formula)
+
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+
+    def expect(self, symbol):
+        if self.peek() != ("symbol", symbol):
+            raise self.error("Expected '" + symbol + "'")
+        self.pos += 1
+
+
+    def parse(self):
+        node = self.parse_sum()
+        if self.pos < len(self.tokens):
+            raise self.error("Unexpected '" + str(self.peek()[1]) + "'")
+        return node[0]
+
+
+    def parse_sum(self):
+        return self.parse_binary(self.parse_product, ["+", "-"])
+
+
+    def parse_product(self):
+        return self.parse_binary(self.parse_unary, ["*", "/"])
+
+
+    def parse_binary(self, parse_operand, symbols):
+        # Left associative chain of operators of equal precedence
+        left, left_value = parse_operand()
+        while self.peek()[0] == "symbol" and self.peek()[1] in symbols:
+            op_func = OPERATORS[self.peek()[1]]
+            self.pos += 1
+            right, right_value = parse_operand()
+            if left_value is not None and right_value is not None:
+                left, left_value = constant_node(op_func(left_value, right_value))
+            else:
+                left, left_value = (lambda env, l=left, r=right, f=op_func: f(l(env), r(env))), \
+                    None
+        return left, left_value
+
+
+    def parse_unary(self):
+        if self.peek() == ("symbol", "-"):
+            self.pos += 1
+            operand, operand_value = self.parse_unary()
+            if operand_value is not None:
+                return constant_node(-operand_value)
+            return (lambda env: -operand(env)), None
+        if self.peek() == ("symbol", "+"):
+            self.pos += 1
+            return self.parse_unary()
+        return self.parse_atom()
+
+
+    def parse_atom(self):
+        kind, value = self.peek()
+        self.pos += 1
+        if kind == "number":
+            return constant_node(value)
+        if kind == "modifier":
+            return (lambda env: env[0][value]), None
+        if kind == "reference":
+            self.references.add(value)
+            return (lambda env: env[1][value]), None
+        if kind == "symbol" and value == "(":
+            node = self.parse_sum()
+            self.expect(")")
+            return node
+        if kind == "name":
+            if value in CONSTANTS:
+                return constant_node(CONSTANTS[value])
+            if value in VIEWBOX_NAMES:
+                vb_idx = VIEWBOX_NAMES[value]
+                return (lambda env: env[2][vb_idx]), None
+            if value == "if" or value in FUNCTIONS:
+                return self.parse_call(value)
+        raise self.error("Unexpected '" + str(value) + "'")
+
+
+    def parse_call(self, func_name):
+        self.expect("(")
+        args = [self.parse_sum()[0]]
+        while self.peek() == ("symbol", ","):
+            self.pos += 1
+            args.append(self.parse_sum()[0])
+        self.expect(")")
+        if func_name == "if":
+            # if(condition, a, b) is a if condition > 0, otherwise b
+            if len(args) != 3:
+                raise self.error("if takes 3 arguments")
+            cond, if_true, if_false = args
+            return (lambda env: if_true(env) if cond(env) > 0 else if_false(env)), None
+        func = FUNCTIONS[func_name]
+        if len(args) == 1:
+            arg = args[0]
+            return (lambda env: func(arg(env))), None
+        return (lambda env: func(*[arg(env) for arg in args])), None
+
+
+class CompiledEquations():
+
+    def __init__(self, formulas):
+        self.formulas = []
+        references = []
+        for formula in formulas:
+            formula_parser = FormulaParser(formula)
+            self.formulas.append(formula_parser.parse())
+            references.append(formula_parser.references)
+        self.order = CompiledEquations.evaluation_order(references)
+
+
+    @staticmethod
+    def evaluation_order(references):
+        # Order equations so that each is evaluated after the equations it refers to
+        order, state = [], {}
+        for start_idx in range(len(references)):
+            # Iterative depth first search, to cope with long chains of references
+            stack = [(start_idx, False)]
+            while stack:
+                eq_idx, is_done = stack.pop()
+                if is_done:
+                    state[eq_idx] = "done"
+                    order.append(eq_idx)
+                    continue
+                if state.get(eq_idx) == "done":
+                    continue
+                if eq_idx >= len(references):
+                    raise ValueError("Reference to missing equation ?f" + str(eq_idx))
+                if state.get(eq_idx) == "visiting":
+                    raise ValueError("Circular reference to equation ?f" + str(eq_idx))
+                state[eq_idx] = "visiting"
+                stack.append((eq_idx, True))
+                for ref_idx in sorted(references[eq_idx], reverse=True):
+                    if state.get(ref_idx) != "done":
+                        if state.get(ref_idx) == "visiting":
+                            raise ValueError("Circular reference to equation ?f" + str(ref_idx))
+                        stack.append((ref_idx, False))
+        return order
+
+
+    def evaluate(self, modifiers, vb):
+        results = [None] * len(self.formulas)
+        env = (modifiers, results, vb)
+        for eq_idx in self.order:
+            results[eq_idx] = float(self.formulas[eq_idx](env))
+        return results
+
+
+class EquationCompiler():
+
+    # Compiled equation sets, keyed by draw:type and formulas (custom shapes of the same
+    #  type, e.g. "non-primitive", can have different equations), least recently used first
+    compiled = OrderedDict()
+    max_equation_sets = MAX_EQUATION_SETS
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def compile(cls, geom_type, formulas):
+        key = (geom_type, tuple(formulas))
+        if key in cls.compiled:
+            cls.hits += 1
+            cls.compiled.move_to_end(key)
+            return cls.compiled[key]
+        cls.misses += 1
+        equations = CompiledEquations(formulas)
+        cls.compiled[key] = equations
+        if len(cls.compiled) > cls.max_equation_sets:
+            cls.compiled.popitem(last=False)
+        return equations
+
+
+    @classmethod
+    def stats(cls):
+        return {"hits": cls.hits, "misses": cls.misses, "equation_sets": len(cls.compiled)}
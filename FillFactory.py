@@ -5,9 +5,7 @@
 # pylint: disable=R0914 # Too many local variables
 # pylint: disable=R0915 # Too many statements
 
-import zipfile
 import math
-from PIL import Image
 from ODPFunctions import units_to_float
 
 DPCM = 37.7953
@@ -28,7 +26,7 @@ class FillFactory():
     def fill_gradient(cls, dwg, elt, pres, attrs, e_width, e_height):
         gradient_name = attrs["draw:fill-gradient-name"]
         # office:styles / draw:gradient having draw:name == gradient_name
-        grad = pres.styles.find({"draw:gradient"}, {"draw:name": gradient_name})
+        grad = pres.styles_registry.gradient(gradient_name)
         if grad["draw:style"] == "linear" or grad["draw:style"] == "axial":
             linear_angle = int(grad["draw:angle"])/10
             quadrant = math.floor(linear_angle / 90)
@@ -67,8 +65,8 @@ class FillFactory():
                 x_1, y_1 = e_width - side_x, -side_y
                 x_2, y_2 = side_x, e_height + side_y
 
-            linear_grad = dwg.defs.add(dwg.linearGradient((x_1, y_1), (x_2, y_2),\
-                gradientUnits='userSpaceOnUse'))
+            linear_grad = dwg.linearGradient((x_1, y_1), (x_2, y_2),\
+                gradientUnits='userSpaceOnUse')
 
             if grad["draw:style"] == "linear":
                 linear_grad.add_stop_color(0, grad["draw:start-color"],\
@@ -88,20 +86,22 @@ class FillFactory():
                     grad["draw:end-color"], (int(grad["draw:end-intensity"][:-1])/100))
                 linear_grad.add_stop_color(1, grad["draw:end-color"],\
                     (int(grad["draw:end-intensity"][:-1])/100))
+            linear_grad = pres.add_def(linear_grad)
             # Draw linear/axial gradient to screen
             linear_bg = dwg.pattern(insert=(0, 0), size=(e_width, e_height))
             linear_bg.add(dwg.rect((0, 0), (e_width, e_height), fill=linear_grad.get_paint_server()))
-            dwg.defs.add(linear_bg)
+            linear_bg = pres.add_def(linear_bg)
             elt.fill(linear_bg.get_paint_server())
 
         elif grad["draw:style"] == "radial":
-            radial_grad = dwg.defs.add(dwg.radialGradient())
+            radial_grad = dwg.radialGradient()
             radial_grad.add_stop_color(0, grad["draw:end-color"],\
                 (int(grad["draw:end-intensity"][:-1])/100))
             radial_grad.add_stop_color(1-(int(grad["draw:border"][:-1])/100),\
                 grad["draw:start-color"], (int(grad["draw:start-intensity"][:-1])/100))
             radial_grad.add_stop_color(1, grad["draw:start-color"],\
                 (int(grad["draw:start-intensity"][:-1])/100))
+            radial_grad = pres.add_def(radial_grad)
             radial_bg = dwg.pattern(insert=(0, 0), size=(e_width, e_height))
             radial_bg.add(dwg.rect((0, 0), (e_width, e_height), fill=grad["draw:start-color"]))
             circle_x = e_width * (int(grad["draw:cx"][:-1])/100)
@@ -109,7 +109,7 @@ class FillFactory():
             circle_r = math.sqrt((e_width/2)*(e_width/2) + (e_height/2)*(e_height/2))
             radial_bg.add(dwg.circle((circle_x, circle_y), circle_r, \
                 fill=radial_grad.get_paint_server()))
-            dwg.defs.add(radial_bg)
+            radial_bg = pres.add_def(radial_bg)
             elt.fill(radial_bg.get_paint_server())
         else:
             print("Gradient not supported: " + grad["draw:style"])
@@ -118,11 +118,11 @@ class FillFactory():
 
     @classmethod
     def fill_bitmap(cls, dwg, elt, pres, attrs, e_width, e_height):
-        image_node = pres.styles.find("office:styles")\
-            .find({"draw:fill-image"}, {"draw:name": attrs["draw:fill-image-name"]})
-        # Extract image to data store
-        pres_archive = zipfile.ZipFile(pres.url, 'r')
-        pres_archive.extract(image_node["xlink:href"], pres.data_store)
+        image_node = pres.styles_registry.fill_image(attrs["draw:fill-image-name"])
+        # Extract image to data store, and use a derivative of it at the size the image is
+        #  displayed (if there is one)
+        image_href = image_node["xlink:href"]
+        image_url = pres.assets.asset_url(image_href)
         if "draw:fill-image-width" in attrs:
             if attrs["draw:fill-image-width"][-1] == "%":
                 bitmap_width = e_width * (int(attrs["draw:fill-image-width"][:-1])/100)
@@ -133,16 +133,16 @@ class FillFactory():
             if bitmap_width > 0 and bitmap_height > 0:
                 pattern_size = (bitmap_width, bitmap_height)
             else:
-                with Image.open(pres.data_store + image_node["xlink:href"]) as img:
-                    im_width, im_height = img.size
-                pattern_size = (im_width/DPCM, im_height/DPCM)
+                image_info = pres.assets.image_info(image_href)
+                pattern_size = (image_info.width/DPCM, image_info.height/DPCM)
 
         if attrs["style:repeat"] == "stretch":
+            image_url = pres.assets.image_url(image_href, (e_width, e_height)) or image_url
             pattern = dwg.pattern(insert=(0, 0), size=(e_width, e_height), \
                 patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-            pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
+            pattern.add(dwg.image(image_url,\
                     insert=(0, 0), size=(e_width, e_height), preserveAspectRatio="none"))
-            dwg.defs.add(pattern)
+            pattern = pres.add_def(pattern)
             elt.fill(pattern.get_paint_server())
 
         elif attrs["style:repeat"] == "no-repeat":
@@ -159,264 +159,147 @@ class FillFactory():
             else:
                 image_y = e_height - bitmap_height
 
+            image_url = pres.assets.image_url(image_href, (bitmap_width, bitmap_height)) \
+                or image_url
             pattern = dwg.pattern(insert=(0, 0), size=(e_width, e_height), \
                 patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-            pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
+            pattern.add(dwg.image(image_url,\
                 insert=(image_x, image_y), size=(bitmap_width, bitmap_height), \
                 preserveAspectRatio="none"))
-            dwg.defs.add(pattern)
+            pattern = pres.add_def(pattern)
             elt.fill(pattern.get_paint_server())
 
         else: # Tiled background
-            # Adjust pattern start point based on reference point
-            if attrs["draw:fill-image-ref-point"] in ["top", "center", "bottom"]:
-                x_base = (((e_width - pattern_size[0])/2) % pattern_size[0]) / pattern_size[0]
-                col_count_parity = (((e_width - pattern_size[0])/2) // pattern_size[0] % 2)
-                if col_count_parity == 0:
-                    tile_col_offset = [1, 0, 1]
-                else:
-                    tile_col_offset = [0, 1, 0]
-            elif attrs["draw:fill-image-ref-point"] in ["top-right", "right", "bottom-right"]:
-                x_base = (e_width % pattern_size[0]) / pattern_size[0]
-                col_count_parity = (e_width // pattern_size[0]) % 2
-                if col_count_parity == 0:
-                    tile_col_offset = [0, 1, 0]
-                else:
-                    tile_col_offset = [1, 0, 1]
-            else: # top-left, center-left, bottom-left
-                x_base = 0.0
-                tile_col_offset = [1, 0, 1] # First full column (index 1) is not offset
-            if attrs["draw:fill-image-ref-point"] in ["left", "center", "right"]:
-                y_base = (((e_height - pattern_size[1])/2) % pattern_size[1]) / pattern_size[1]
-                row_count_parity = (((e_height - pattern_size[1])/2) // pattern_size[1] % 2)
-                if row_count_parity == 0:
-                    tile_row_offset = [1, 0, 1]
-                else:
-                    tile_row_offset = [0, 1, 0]
-            elif attrs["draw:fill-image-ref-point"] in ["bottom-left", "bottom", "bottom-right"]:
-                y_base = (e_height % pattern_size[1]) / pattern_size[1]
-                row_count_parity = (e_height // pattern_size[1]) % 2
-                if row_count_parity == 0:
-                    tile_row_offset = [0, 1, 0]
-                else:
-                    tile_row_offset = [1, 0, 1]
-            else:
-                y_base = 0.0
-                tile_row_offset = [1, 0, 1] # First full row (index 1) is not offset
-            # Adjust pattern offset
-            x_offset = x_base + ((int(attrs["draw:fill-image-ref-point-x"][:-1])%100))/100
-            if x_offset >= 1:
-                x_offset -= 1
-                if tile_col_offset == [0, 1, 0]:
-                    tile_col_offset = [1, 0, 1]
-                else:
-                    tile_col_offset = [0, 1, 0]
-            y_offset = y_base + ((int(attrs["draw:fill-image-ref-point-y"][:-1])%100))/100
-            if y_offset >= 1:
-                y_offset -= 1
-                if tile_row_offset == [0, 1, 0]:
-                    tile_row_offset = [1, 0, 1]
-                else:
-                    tile_row_offset = [0, 1, 0]
-
-            # Determine if image has row/col offset or not
-            offset_type = attrs["draw:tile-repeat-offset"].split(" ")
-            if offset_type[0] == "0%":
-                pattern = dwg.pattern(insert=(0, 0), size=pattern_size, \
-                    patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-                pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                    insert=(x_offset*pattern_size[0], y_offset*pattern_size[1]),\
-                    size=pattern_size, preserveAspectRatio="none"))
-                pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                    insert=((x_offset-1)*pattern_size[0], y_offset*pattern_size[1]),\
-                    size=pattern_size, preserveAspectRatio="none"))
-                pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                    insert=(x_offset*pattern_size[0], (y_offset-1)*pattern_size[1]),\
-                    size=pattern_size, preserveAspectRatio="none"))
-                pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                    insert=((x_offset-1)*pattern_size[0], (y_offset-1)*pattern_size[1]),\
-                    size=pattern_size, preserveAspectRatio="none"))
-            else:
-                tiled_offset = (int(offset_type[0][:-1])%100)/100
-                if offset_type[1] == "horizontal":
-                    # Horizontal tiling - make fill 1 wide x 2 high
-                    pattern = dwg.pattern(insert=(0, 0), size=(pattern_size[0], 2*pattern_size[1]),\
-                        patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-                    if tiled_offset + x_offset >= 1:
-                        tiled_offset -= 1
-                    # Top row
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset + tiled_offset*tile_row_offset[0]) * pattern_size[0],\
-                            (y_offset-1)*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset-1 + tiled_offset*tile_row_offset[0]) * pattern_size[0],\
-                            (y_offset-1)*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    # Centre row
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset + tiled_offset*tile_row_offset[1]) * pattern_size[0],\
-                            y_offset*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset-1 + tiled_offset*tile_row_offset[1]) * pattern_size[0],\
-                            y_offset*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    # Bottom row
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset + tiled_offset*tile_row_offset[2]) * pattern_size[0],\
-                            (y_offset+1)*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset-1 + tiled_offset*tile_row_offset[2]) * pattern_size[0],\
-                            (y_offset+1)*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                else:
-                    # Vertical tiling - make fill 2 wide x 1 high
-                    pattern = dwg.pattern(insert=(0, 0), size=(2*pattern_size[0], pattern_size[1]),\
-                        patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-                    if tiled_offset + y_offset >= 1:
-                        tiled_offset -= 1
-                    # Left column
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset-1) * pattern_size[0],\
-                            (y_offset-1 + tiled_offset*tile_col_offset[0]) * pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset-1) * pattern_size[0],\
-                            (y_offset + tiled_offset*tile_col_offset[0])*pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    # Centre column
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=(x_offset * pattern_size[0],\
-                            (y_offset-1 + tiled_offset*tile_col_offset[1]) * pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=(x_offset * pattern_size[0],\
-                            (y_offset + tiled_offset*tile_col_offset[1]) * pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    # Right column
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset+1) * pattern_size[0],\
-                            (y_offset-1 + tiled_offset*tile_col_offset[2]) * pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-                    pattern.add(dwg.image(pres.data_store + image_node["xlink:href"],\
-                        insert=((x_offset+1) * pattern_size[0],\
-                            (y_offset + tiled_offset*tile_col_offset[2]) * pattern_size[1]),\
-                        size=pattern_size, preserveAspectRatio="none"))
-            dwg.defs.add(pattern)
+            image_url = pres.assets.image_url(image_href, pattern_size) or image_url
+            pattern = FillFactory.tiled_pattern(dwg, pres, attrs, image_url, pattern_size, \
+                e_width, e_height)
             elt.fill(pattern.get_paint_server())
 
 
     @classmethod
-    def fill_hatch(cls, dwg, elt, pres, attrs, e_width, e_height, style_tag):
-        hatch_node = pres.styles.find("office:styles")\
-            .find({"draw:hatch"}, {"draw:name": attrs["draw:fill-hatch-name"]})
+    def tiled_pattern(cls, dwg, pres, attrs, image_url, tile_size, e_width, e_height):
+        # Every tiled fill is derived from a pattern of a single tile, so the image is only
+        #  referenced once for each size it is tiled at
+        tile = dwg.pattern(insert=(0, 0), size=tile_size, \
+            patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
+        tile.add(dwg.image(image_url, insert=(0, 0), size=tile_size, preserveAspectRatio="none"))
+        tile = pres.add_def(tile)
+        # Position of the tile at the reference point, which is never offset
+        ref_point = attrs["draw:fill-image-ref-point"]
+        x_anchor = FillFactory.tile_anchor(ref_point, ["top", "center", "bottom"], \
+            ["top-right", "right", "bottom-right"], e_width, tile_size[0], \
+            attrs["draw:fill-image-ref-point-x"])
+        y_anchor = FillFactory.tile_anchor(ref_point, ["left", "center", "right"], \
+            ["bottom-left", "bottom", "bottom-right"], e_height, tile_size[1], \
+            attrs["draw:fill-image-ref-point-y"])
+        offset_type = attrs["draw:tile-repeat-offset"].split(" ")
+        tiled_offset = (int(offset_type[0][:-1])%100)/100
+        if tiled_offset == 0:
+            cell_size = tile_size
+            pattern = dwg.pattern(inherit=tile)
+        else:
+            # Alternate rows (horizontal) or columns (vertical) are offset, so the fill repeats
+            #  every two tiles - the tile at the reference point, then an offset tile
+            if offset_type[1] == "horizontal":
+                cell_size = (tile_size[0], 2*tile_size[1])
+                tile_shift, next_insert = (tiled_offset*tile_size[0], 0), (0, tile_size[1])
+            else:
+                cell_size = (2*tile_size[0], tile_size[1])
+                tile_shift, next_insert = (0, tiled_offset*tile_size[1]), (tile_size[0], 0)
+            shifted_tile = dwg.pattern(inherit=tile)
+            shifted_tile.translate(*tile_shift)
+            shifted_tile = pres.add_def(shifted_tile)
+            pattern = dwg.pattern(insert=(0, 0), size=cell_size, \
+                patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
+            pattern.add(dwg.rect((0, 0), tile_size, fill=tile.get_paint_server()))
+            pattern.add(dwg.rect(next_insert, tile_size, fill=shifted_tile.get_paint_server()))
+        # The fill repeats every cell, so only the anchor's position within a cell matters
+        pattern.translate(x_anchor % cell_size[0], y_anchor % cell_size[1])
+        return pres.add_def(pattern)
+
+
+    @staticmethod
+    def tile_anchor(ref_point, centre_points, end_points, e_size, t_size, ref_offset):
+        # Tile position along one axis: from the start, centre or end of the element, moved
+        #  on by the reference point offset (a percentage of the tile size)
+        if ref_point in centre_points:
+            anchor = (e_size - t_size) / 2
+        elif ref_point in end_points:
+            anchor = e_size - t_size
+        else:
+            anchor = 0.0
+        return anchor + ((int(ref_offset[:-1])%100)/100) * t_size
+
+
+    @classmethod
+    def fill_hatch(cls, dwg, elt, pres, attrs, e_width, e_height):
+        hatch_node = pres.styles_registry.hatch(attrs["draw:fill-hatch-name"])
         hatch_angle = int(hatch_node["draw:rotation"])/10
         hatch_dist = units_to_float(str(hatch_node["draw:distance"]))
-        # Print background color first
-        pattern = dwg.pattern(insert=(0, 0), size=(e_width, e_height), \
-                patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
-        if style_tag.find("style:graphic-properties")["draw:fill-hatch-solid"] == "true":
-            pattern.add(dwg.rect((0, 0), (e_width, e_height),\
-                fill=attrs["draw:fill-color"]))
+        if attrs.get("draw:fill-hatch-solid") == "true":
+            bg_color = attrs["draw:fill-color"]
         else:
-            pattern.add(dwg.rect((0, 0), (e_width, e_height), fill='#ffffff'))
-        # Single line hatch
-        FillFactory.draw_hatching(dwg, pattern, hatch_angle, hatch_dist,\
-            hatch_node["draw:color"], 1/DPCM, e_width, e_height)
-        # Double line hatch
-        if hatch_node["draw:style"] in ["double", "triple"]:
-            FillFactory.draw_hatching(dwg, pattern, hatch_angle + 90, hatch_dist,\
-                hatch_node["draw:color"], 1/DPCM, e_width, e_height)
-        # Triple line hatch
-        if hatch_node["draw:style"] == "triple":
-            FillFactory.draw_hatching(dwg, pattern, hatch_angle + 135, hatch_dist,\
-                hatch_node["draw:color"], 1/DPCM, e_width, e_height)
-        dwg.defs.add(pattern)
+            bg_color = '#ffffff'
+        pattern = FillFactory.hatch_pattern(dwg, pres, hatch_node["draw:style"], hatch_angle, \
+            hatch_dist, hatch_node["draw:color"], bg_color, e_width, e_height)
         elt.fill(pattern.get_paint_server())
 
 
     @classmethod
-    def draw_hatching(cls, dwg, pattern, angle, h_dist, h_color, h_width, e_width, e_height):
-        # Based on implementation from DrawHatch() and CalcHatchValues() in
-        # https://github.com/LibreOffice/core/blob/master/vcl/source/outdev/hatch.cxx
-
-        hatch_angle = angle % 180
-        if hatch_angle > 90:
-            hatch_angle -= 180
-
-        if hatch_angle == 0:
-            x_0, y_0 = 0, 0
-            x_1, y_1 = e_width, 0
-            while y_0 < e_height:
-                pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
-                y_0 += h_dist
-                y_1 += h_dist
-        elif hatch_angle == 90:
-            x_0, y_0 = 0, 0
-            x_1, y_1 = 0, e_height
-            while x_0 < e_width:
-                pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
-                x_0 += h_dist
-                x_1 += h_dist
-        elif -45 <= hatch_angle <= 45:
-            offset_y = e_width * math.tan(math.radians(abs(hatch_angle)))
-            if hatch_angle > 0:
-                x_0, y_0 = 0, 0
-                x_1, y_1 = e_width, -offset_y
-            else:
-                x_0, y_0 = 0, -offset_y
-                x_1, y_1 = e_width, 0
-            while y_0 < e_height or y_1 < e_height:
-                pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
-                y_0 += h_dist / math.cos(math.radians(abs(hatch_angle)))
-                y_1 += h_dist / math.cos(math.radians(abs(hatch_angle)))
-        else:
-            offset_x = e_height / math.tan(math.radians(abs(hatch_angle)))
-            if hatch_angle > 0:
-                x_0, y_0 = 0, 0
-                x_1, y_1 = -offset_x, e_height
-            else:
-                x_0, y_0 = -offset_x, 0
-                x_1, y_1 = 0, e_height
-            while x_0 < e_width or x_1 < e_width:
-                pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
-                x_0 += h_dist / math.sin(math.radians(abs(hatch_angle)))
-                x_1 += h_dist / math.sin(math.radians(abs(hatch_angle)))
+    def hatch_pattern(cls, dwg, pres, h_style, angle, h_dist, h_color, bg_color, e_width, \
+        e_height):
+        # Hatching is tiled from a single period of its lines, so single and double hatches
+        #  don't depend on the size of the element being filled (and are shared by every
+        #  element with the same hatch)
+        if h_style == "triple":
+            # The third set of lines is at 45 degrees to the others, so can't be tiled with them.
+            #  Both tilings are overlaid in a pattern covering the element, in its user space
+            crossed = FillFactory.hatch_cell(dwg, pres, angle, h_dist, h_color, bg_color, True)
+            diagonal = FillFactory.hatch_cell(dwg, pres, angle + 135, h_dist, h_color, None, False)
+            pattern = dwg.pattern(insert=(0, 0), size=(e_width, e_height), \
+                patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
+            pattern.add(dwg.rect((0, 0), (e_width, e_height), fill=crossed.get_paint_server()))
+            pattern.add(dwg.rect((0, 0), (e_width, e_height), fill=diagonal.get_paint_server()))
+            return pres.add_def(pattern)
+        return FillFactory.hatch_cell(dwg, pres, angle, h_dist, h_color, bg_color, \
+            h_style == "double")
 
 
     @classmethod
-    def fill(cls, dwg, elt, pres, attrs, e_width, e_height, style_tag):
-        fill_params = {}
-        if style_tag["style:family"] == "drawing-page":
-            style_attrs = style_tag.find({"style:drawing-page-properties"}).attrs
-        else:
-            style_attrs = style_tag.find({"style:graphic-properties"}).attrs
-        if "style:parent-style-name" in style_tag.attrs:
-            parent_style_tag = pres.styles.find("office:styles")\
-                .find({"style:style"}, {"style:name" : style_tag["style:parent-style-name"]})
-            # Get fill parameters either from style tag or, if they don't exist there, from
-            #  the parent style tag
-            parent_attrs = parent_style_tag.find({"style:graphic-properties"}).attrs
-            # TODO: Add the other attrs in here (and below)!!!!!
-            for x in ["draw:fill", "draw:fill-color"]:
-                if x in style_attrs:
-                    fill_params[x] = style_attrs[x]
-                elif x in parent_attrs:
-                    fill_params[x] = parent_attrs[x]
+    def hatch_cell(cls, dwg, pres, angle, h_dist, h_color, bg_color, crossed):
+        # One period of hatching - a square with a line (and a crossing line, for double
+        #  hatches) through its centre, rotated so that the lines pass through the origin at
+        #  the hatch angle (which is anticlockwise)
+        pattern = dwg.pattern(insert=(0, 0), size=(h_dist, h_dist), \
+            patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
+        pattern.rotate(-angle)
+        pattern.translate(-h_dist/2, -h_dist/2)
+        if bg_color:
+            pattern.add(dwg.rect((0, 0), (h_dist, h_dist), fill=bg_color))
+        pattern.add(dwg.line((0, h_dist/2), (h_dist, h_dist/2), stroke=h_color, \
+            stroke_width=1/DPCM))
+        if crossed:
+            pattern.add(dwg.line((h_dist/2, 0), (h_dist/2, h_dist), stroke=h_color, \
+                stroke_width=1/DPCM))
+        return pres.add_def(pattern)
+
+
+    @classmethod
+    def fill(cls, dwg, elt, pres, style, e_width, e_height):
+        # Get fill parameters from the computed style, which already includes any values
+        #  inherited from the parent style chain
+        if style.family == "drawing-page":
+            attrs = style.drawing_page
         else:
-            for x in ["draw:fill", "draw:fill-color"]:
-                if x in style_attrs:
-                    fill_params[x] = style_attrs[x]
+            attrs = style.graphic
 
-        if fill_params["draw:fill"] == "none":
+        if attrs.get("draw:fill") == "none":
             FillFactory.fill_none(elt)
-        elif fill_params["draw:fill"] == "solid":
-            FillFactory.fill_solid(elt, fill_params)
-        elif fill_params["draw:fill"] == "gradient":
+        elif attrs.get("draw:fill") == "solid":
+            FillFactory.fill_solid(elt, attrs)
+        elif attrs.get("draw:fill") == "gradient":
             FillFactory.fill_gradient(dwg, elt, pres, attrs, e_width, e_height)
-        elif fill_params["draw:fill"] == "bitmap":
+        elif attrs.get("draw:fill") == "bitmap":
             FillFactory.fill_bitmap(dwg, elt, pres, attrs, e_width, e_height)
-        elif fill_params["draw:fill"] == "hatch":
-            FillFactory.fill_hatch(dwg, elt, pres, attrs, e_width, e_height, style_tag)
+        elif attrs.get("draw:fill") == "hatch":
+            FillFactory.fill_hatch(dwg, elt, pres, attrs, e_width, e_height)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import re
+from collections import OrderedDict
+from PIL import ImageFont
+
+MAX_FACES = 64
+MAX_WIDTHS = 65536
+# Words and the runs of spaces between them
+RUN_PARTS_PATTERN = re.compile(r'([ ]+)')
+
+class FontCache():
+
+    # Process-wide instance, shared by every presentation converted in this process
+    shared_cache = None
+
+    def __init__(self, font_index, max_faces=MAX_FACES, max_widths=MAX_WIDTHS):
+        self.font_index = font_index
+        self.max_faces = max_faces
+        self.max_widths = max_widths
+        self.paths = {}
+        # Loaded FreeType faces, least recently used first
+        self.faces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Advance widths of text runs keyed by (font file, pixel size, text)
+        self.widths = OrderedDict()
+        self.width_hits = 0
+        self.width_misses = 0
+
+
+    @classmethod
+    def shared(cls, font_index):
+        if cls.shared_cache is None:
+            cls.shared_cache = FontCache(font_index)
+        return cls.shared_cache
+
+
+    def font_path(self, family, style, weight):
+        key = (family, style, weight)
+        if key not in self.paths:
+            self.paths[key] = self.font_index.find_font(family, style, weight)
+        return self.paths[key]
+
+
+    def font(self, family, style, weight, px_size):
+        key = (family, style, weight, px_size)
+        if key in self.faces:
+            self.hits += 1
+            self.faces.move_to_end(key)
+            return self.faces[key]
+        self.misses += 1
+        face = ImageFont.truetype(self.font_path(family, style, weight), px_size)
+        self.faces[key] = face
+        if len(self.faces) > self.max_faces:
+            self.faces.popitem(last=False)
+        return face
+
+
+    def text_width(self, face, text):
+        key = (face.path, face.size, text)
+        if key in self.widths:
+            self.width_hits += 1
+            self.widths.move_to_end(key)
+            return self.widths[key]
+        self.width_misses += 1
+        width = face.getsize(text)[0]
+        self.widths[key] = width
+        if len(self.widths) > self.max_widths:
+            self.widths.popitem(last=False)
+        return width
+
+
+    def text_widths(self, face, runs):
+        # Measure a batch of text runs (e.g. all words of a paragraph) in one pass, only
+        #  measuring each distinct run once
+        run_widths = {}
+        for run in runs:
+            if run not in run_widths:
+                run_widths[run] = self.text_width(face, run)
+        return [run_widths[run] for run in runs]
+
+
+    def run_width(self, face, text):
+        # Width of a run of words and spaces as the sum of their (cached) widths, ignoring
+        #  kerning between them as line layout does, so that runs of any length are measured
+        #  from the same few cached entries
+        return sum(self.text_width(face, part) for part in RUN_PARTS_PATTERN.split(text) if part)
+
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "faces": len(self.faces), \
+            "paths": len(self.paths), "width_hits": self.width_hits, \
+            "width_misses": self.width_misses, "widths": len(self.widths)}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import hashlib
+import json
+import os
+from PIL import ImageFont
+try:
+    from fontTools.ttLib import TTFont
+except ImportError:
+    TTFont = None
+
+INDEX_VERSION = 2
+HOME_DIR = os.path.expanduser("~")
+CACHE_DIR = os.path.join(HOME_DIR, ".cache", "odp2html5")
+FONT_DIRECTORIES = [
+    "/usr/share/fonts/", "/usr/local/share/fonts/",
+    "/usr/X11R6/lib/X11/fonts/TTF/", "/usr/X11/lib/X11/fonts",
+    "/usr/lib/openoffice/share/fonts/truetype/", "/usr/lib/libreoffice/share/fonts/truetype/",
+    "/Library/Fonts/", "/Network/Library/Fonts/", "/System/Library/Fonts/",
+    os.path.join(HOME_DIR, ".fonts"), os.path.join(HOME_DIR, ".local", "share", "fonts"),
+    os.path.join(HOME_DIR, "Library", "Fonts"),
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+    os.path.join(os.environ.get("LOCALAPPDATA", HOME_DIR), "Microsoft", "Windows", "Fonts")]
+FONT_EXTENSIONS = [".ttf", ".otf", ".ttc"]
+# Families tried, in order, when the requested family is not installed
+FALLBACK_FAMILIES = ["dejavu sans", "liberation sans", "arial", "helvetica", "freesans"]
+FONT_WEIGHTS = {"thin": 100, "extralight": 200, "ultralight": 200, "light": 300, \
+    "normal": 400, "regular": 400, "book": 400, "medium": 500, "semibold": 600, \
+    "demibold": 600, "bold": 700, "extrabold": 800, "ultrabold": 800, "black": 900, \
+    "heavy": 900}
+
+class FontIndex():
+
+    # Process-wide font index, shared by every presentation converted in this process
+    shared_index = None
+
+    def __init__(self, fonts):
+        # Each font is a dict of path, family, style ("normal", "italic" or "oblique") and
+        #  numeric weight
+        self.fonts = fonts
+        self.key = None
+
+
+    def index_key(self):
+        # Hash of the indexed fonts, which changes whenever fonts are installed, removed or
+        #  changed (as far as the index records them)
+        if self.key is None:
+            self.key = hashlib.sha1(json.dumps(self.fonts, sort_keys=True).encode()).hexdigest()
+        return self.key
+
+
+    @classmethod
+    def shared(cls, cache_dir=CACHE_DIR):
+        if cls.shared_index is None:
+            cls.shared_index = FontIndex.load(cache_dir)
+        return cls.shared_index
+
+
+    @staticmethod
+    def directory_key():
+        # Modification times of every font directory (and sub-directory), which change
+        #  whenever a font file is added to or removed from that directory
+        dir_mtimes = {}
+        for font_dir in FONT_DIRECTORIES:
+            for dir_path, _, _ in os.walk(font_dir):
+                try:
+                    dir_mtimes[dir_path] = os.stat(dir_path).st_mtime
+                except OSError:
+                    pass
+        return dir_mtimes
+
+
+    @staticmethod
+    def load(cache_dir=CACHE_DIR):
+        # Load the font index from the cache file if the font directories are unchanged
+        #  since it was written, otherwise rescan the font directories and rewrite the cache
+        index_file = os.path.join(cache_dir, "fontindex.json")
+        dir_key = FontIndex.directory_key()
+        try:
+            with open(index_file, 'r') as index_in:
+                index_data = json.load(index_in)
+            if index_data["version"] == INDEX_VERSION and index_data["directories"] == dir_key:
+                return FontIndex(index_data["fonts"])
+        except (OSError, ValueError, KeyError):
+            pass
+        font_index = FontIndex(FontIndex.scan_fonts())
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(index_file, 'w') as index_out:
+                json.dump({"version": INDEX_VERSION, "directories": dir_key, \
+                    "fonts": font_index.fonts}, index_out)
+        except OSError:
+            print("Unable to write font index cache to " + cache_dir)
+        return font_index
+
+
+    @staticmethod
+    def scan_fonts():
+        fonts = []
+        for font_dir in FONT_DIRECTORIES:
+            for dir_path, _, file_names in os.walk(font_dir):
+                for file_name in sorted(file_names):
+                    if os.path.splitext(file_name)[1].lower() in FONT_EXTENSIONS:
+                        font_path = os.path.join(dir_path, file_name)
+                        try:
+                            fonts.append(FontIndex.read_font(font_path))
+                        except Exception: # pylint: disable=W0703
+                            print("Unable to read font: " + font_path)
+        return fonts
+
+
+    @staticmethod
+    def read_font(font_path):
+        # Read family, style and weight from the font's name and OS/2 tables, using fontTools
+        #  if it is installed and otherwise the family and style names reported by FreeType
+        if TTFont:
+            with TTFont(font_path, fontNumber=0, lazy=True) as tt_font:
+                name_table = tt_font["name"]
+                family = name_table.getDebugName(16) or name_table.getDebugName(1)
+                sub_family = name_table.getDebugName(17) or name_table.getDebugName(2) or ""
+                if "OS/2" in tt_font:
+                    weight = tt_font["OS/2"].usWeightClass
+                    is_italic = tt_font["OS/2"].fsSelection & 1
+                else:
+                    weight = FontIndex.weight_value(sub_family)
+                    is_italic = tt_font["head"].macStyle & 2
+        else:
+            family, sub_family = ImageFont.truetype(font_path, 12).getname()
+            weight = FontIndex.weight_value(sub_family)
+            is_italic = "italic" in sub_family.lower()
+        if "oblique" in sub_family.lower():
+            style = "oblique"
+        elif is_italic:
+            style = "italic"
+        else:
+            style = "normal"
+        return {"path": font_path, "family": family, "style": style, "weight": weight}
+
+
+    @staticmethod
+    def weight_value(weight):
+        # Convert a numeric weight or weight name (e.g. "bold" or "Semibold Italic") to 100-900
+        if str(weight).isdigit():
+            return int(weight)
+        weight_words = str(weight).lower().replace("-", "").replace(" ", "")
+        for weight_name in sorted(FONT_WEIGHTS, key=len, reverse=True):
+            if weight_name in weight_words:
+                return FONT_WEIGHTS[weight_name]
+        return 400
+
+
+    @staticmethod
+    def find_font_matplotlib(family, style, weight):
+        # Fall back to matplotlib (imported only when needed, as it is slow to import) when no
+        #  fonts were found in the font directories
+        try:
+            from matplotlib import font_manager # pylint: disable=C0415
+        except ImportError:
+            raise ValueError("No fonts found in " + ", ".join(FONT_DIRECTORIES))
+        return font_manager.findfont(font_manager.FontProperties(\
+            family=family, style=style, weight=weight))
+
+
+    def find_font(self, family, style="normal", weight="normal"):
+        # Score each installed font against the requested family, style and weight (lower
+        #  is better) and return the path of the best match
+        if not self.fonts:
+            return FontIndex.find_font_matplotlib(family, style, weight)
+        family = family.lower()
+        weight = FontIndex.weight_value(weight)
+        best_path, best_score = None, None
+        for font in self.fonts:
+            font_family = font["family"].lower()
+            if font_family == family:
+                score = 0
+            elif font_family in FALLBACK_FAMILIES:
+                score = 10 + FALLBACK_FAMILIES.index(font_family)
+            else:
+                score = 100
+            if font["style"] != style:
+                if "normal" in [font["style"], style]:
+                    score += 1
+                else:
+                    score += 0.1
+            score += abs(font["weight"] - weight) / 1000
+            if best_score is None or score < best_score:
+                best_path, best_score = font["path"], score
+        return best_path
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+from lxml import etree
+from ODPFunctions import ODF_NAMESPACES
+
+# Namespace URI -> prefix, extended with any other prefixes declared in parsed documents
+NS_PREFIXES = {uri: prefix for prefix, uri in ODF_NAMESPACES.items()}
+# lxml {namespace}local names -> lower case prefix:local names, as used throughout the parser
+QNAMES = {}
+
+def parse_xml(xml_file):
+    # Parse a whole XML document (e.g. styles.xml), returning its root element
+    return ODFElement(etree.parse(xml_file).getroot())
+
+
+def qualified_name(clark_name, elt):
+    # Names are lower cased, as they were when documents were parsed by BeautifulSoup
+    if clark_name not in QNAMES:
+        if clark_name[0] == "{":
+            uri, local_name = clark_name[1:].split("}")
+            if uri not in NS_PREFIXES:
+                NS_PREFIXES.update({ns_uri: prefix for prefix, ns_uri in elt.nsmap.items() \
+                    if prefix and ns_uri not in NS_PREFIXES})
+            QNAMES[clark_name] = (NS_PREFIXES.get(uri, "ns") + ":" + local_name).lower()
+        else:
+            QNAMES[clark_name] = clark_name.lower()
+    return QNAMES[clark_name]
+
+
+def clark_name(qname):
+    # Inverse of qualified_name, for creating elements and attributes
+    if ":" in qname:
+        prefix, local_name = qname.split(":")
+        return "{" + ODF_NAMESPACES[prefix] + "}" + local_name
+    return qname
+
+
+def name_filter(names):
+    # Matching names may be given as a single name, or a set or list of names
+    if names is None or isinstance(names, (set, frozenset)):
+        return names
+    if isinstance(names, str):
+        return {names}
+    return set(names)
+
+
+class ODFElement():
+    # Thin wrapper around an lxml element, providing the subset of the BeautifulSoup Tag
+    #  interface used by the parser (find, find_all, attrs, name and contents)
+
+    __slots__ = ["element", "_attrs"]
+
+    def __init__(self, element):
+        self.element = element
+        self._attrs = None
+
+
+    @staticmethod
+    def create(name, attrs=None):
+        # New detached element, e.g. a temporary animation node
+        new_elt = ODFElement(etree.Element(clark_name(name)))
+        for attr_name, attr_value in (attrs or {}).items():
+            new_elt[attr_name] = attr_value
+        return new_elt
+
+
+    def __repr__(self):
+        return "<" + self.name + ">"
+
+
+    def __bool__(self):
+        # An element is always truthy, even when it has no children
+        return True
+
+
+    def __eq__(self, other):
+        return isinstance(other, ODFElement) and self.element is other.element
+
+
+    def __hash__(self):
+        return hash(self.element)
+
+
+    @property
+    def name(self):
+        return qualified_name(self.element.tag, self.element)
+
+
+    @property
+    def attrs(self):
+        if self._attrs is None:
+            self._attrs = {qualified_name(attr_name, self.element): attr_value \
+                for attr_name, attr_value in self.element.attrib.items()}
+        return self._attrs
+
+
+    def get(self, attr_name, default=None):
+        return self.attrs.get(attr_name, default)
+
+
+    def __getitem__(self, attr_name):
+        return self.attrs[attr_name]
+
+
+    def __setitem__(self, attr_name, attr_value):
+        self.element.set(clark_name(attr_name), attr_value)
+        self._attrs = None
+
+
+    @property
+    def parent(self):
+        parent_elt = self.element.getparent()
+        return ODFElement(parent_elt) if parent_elt is not None else None
+
+
+    @property
+    def contents(self):
+        # Text and child elements, in document order
+        child_nodes = [self.element.text] if self.element.text else []
+        for child in self.element:
+            if isinstance(child.tag, str):
+                child_nodes.append(ODFElement(child))
+            if child.tail:
+                child_nodes.append(child.tail)
+        return child_nodes
+
+
+    def iter_elements(self, recursive):
+        # Comments and processing instructions are skipped
+        children = self.element.iterdescendants() if recursive else self.element.iterchildren()
+        for child in children:
+            if isinstance(child.tag, str):
+                yield child
+
+
+    def find_all(self, name=None, recursive=True):
+        names = name_filter(name)
+        return [ODFElement(child) for child in self.iter_elements(recursive) \
+            if names is None or qualified_name(child.tag, child) in names]
+
+
+    def find(self, name=None, recursive=True):
+        names = name_filter(name)
+        for child in self.iter_elements(recursive):
+            if names is None or qualified_name(child.tag, child) in names:
+                return ODFElement(child)
+        return None
+
+
+    findChildren = find_all
+    findChild = find
+
+
+    def append(self, child):
+        self.element.append(child.element)
+
+
+    def replace_with(self, text):
+        # Replace the element by a string, merging it with the surrounding text
+        text = text + (self.element.tail or "")
+        parent_elt = self.element.getparent()
+        prev_elt = self.element.getprevious()
+        if prev_elt is not None:
+            prev_elt.tail = (prev_elt.tail or "") + text
+        else:
+            parent_elt.text = (parent_elt.text or "") + text
+        parent_elt.remove(self.element)
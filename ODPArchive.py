@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import zipfile
+import xml.etree.ElementTree as ET
+
+MANIFEST_NS = "urn:oasis:names:tc:opendocument:xmlns:manifest:1.0"
+
+class ODPArchive():
+
+    def __init__(self, url):
+        # Open the archive once - members are only read when requested
+        self.url = url
+        self.zip_file = zipfile.ZipFile(url, 'r')
+        self.members = {info.filename: info for info in self.zip_file.infolist()}
+        self.manifest = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        if self.zip_file:
+            self.zip_file.close()
+            self.zip_file = None
+
+
+    def has_member(self, name):
+        return name in self.members
+
+
+    def checksum(self, name):
+        # CRC and size of a member, as recorded in the archive's directory (so the member
+        #  itself isn't read)
+        member = self.members[name]
+        return format(member.CRC, "08x") + "-" + str(member.file_size)
+
+
+    def read(self, name):
+        return self.zip_file.read(self.members[name])
+
+
+    def open(self, name):
+        return self.zip_file.open(self.members[name], 'r')
+
+
+    def get_manifest(self):
+        # Dictionary of member path -> media type, read from META-INF/manifest.xml
+        if self.manifest is None:
+            self.manifest = {}
+            if self.has_member("META-INF/manifest.xml"):
+                manifest_root = ET.fromstring(self.read("META-INF/manifest.xml"))
+                for entry in manifest_root.iter("{" + MANIFEST_NS + "}file-entry"):
+                    self.manifest[entry.get("{" + MANIFEST_NS + "}full-path")] = \
+                        entry.get("{" + MANIFEST_NS + "}media-type")
+        return self.manifest
+
+
+    def media_type(self, name):
+        return self.get_manifest().get(name)
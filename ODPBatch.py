@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from ODPPresentation import ODPPresentation
+
+# Outcome of converting one presentation - status is "converted", "skipped" or "failed", and
+#  saved_bytes is the output size saved by sharing repeated shapes
+ConversionResult = namedtuple("ConversionResult", \
+    ["deck", "status", "seconds", "pages", "saved_bytes", "error"])
+
+def find_decks(paths):
+    return [deck for deck, _ in find_deck_names(paths)]
+
+def find_deck_names(paths):
+    # Expand each path to the .odp files it contains (directories are searched recursively),
+    #  with the name of each deck's output - its path relative to the directory searched, so
+    #  that decks with the same file name in different subdirectories have different outputs
+    decks = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(".odp"):
+                        deck = os.path.join(dir_path, file_name)
+                        decks.append((deck, os.path.splitext(os.path.relpath(deck, path))[0]))
+        else:
+            decks.append((path, os.path.splitext(os.path.basename(path))[0]))
+    return decks
+
+
+class BatchConverter():
+
+    def __init__(self, output_dir, data_store=None, workers=1, force=False, incremental=False, \
+        split_pages=False, precision=None, image_dpi=None, image_format=None):
+        # Every presentation is written to output_dir as <name>.html and <name>.json (where name
+        #  may include subdirectories, see find_deck_names), with
+        #  images in a data store shared by all of them. The font index and font cache are
+        #  process-wide, and the worker pool (if workers is not 1) is shared by all files
+        self.output_dir = output_dir
+        if data_store is None:
+            data_store = os.path.join(output_dir, "store", "")
+        self.data_store = data_store
+        self.workers = workers
+        self.force = force
+        self.incremental = incremental
+        self.split_pages = split_pages
+        self.precision = precision
+        self.image_dpi = image_dpi
+        self.image_format = image_format
+        self.pool = None
+        self.results = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+
+    def get_pool(self):
+        if self.pool is None and self.workers != 1:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+
+    def output_files(self, deck_name):
+        return (os.path.join(self.output_dir, deck_name + ".html"), \
+            os.path.join(self.output_dir, deck_name + ".json"))
+
+
+    def is_up_to_date(self, deck, deck_name):
+        # Outputs are up to date if they all exist and are newer than the presentation
+        deck_mtime = os.stat(deck).st_mtime
+        for output_file in self.output_files(deck_name):
+            if not os.path.exists(output_file) or os.stat(output_file).st_mtime < deck_mtime:
+                return False
+        return True
+
+
+    def convert(self, deck, deck_name=None):
+        # deck_name is the name of the deck's output files (by default, the deck's file name)
+        if deck_name is None:
+            deck_name = os.path.splitext(os.path.basename(deck))[0]
+        start_time = time.perf_counter()
+        try:
+            if not self.force and self.is_up_to_date(deck, deck_name):
+                result = ConversionResult(deck, "skipped", 0, 0, 0, None)
+            else:
+                html_file, json_file = self.output_files(deck_name)
+                os.makedirs(os.path.dirname(html_file) or ".", exist_ok=True)
+                with ODPPresentation(deck, self.data_store, self.precision, self.image_dpi, \
+                    self.image_format) as pres:
+                    page_count = pres.parse(html_file, json_file, pool=self.get_pool(), \
+                        incremental=self.incremental, split_pages=self.split_pages)
+                result = ConversionResult(deck, "converted", \
+                    time.perf_counter() - start_time, page_count, pres.saved_bytes, None)
+        except Exception as convert_error: # pylint: disable=W0703
+            # A missing or broken presentation shouldn't stop the rest of the batch
+            result = ConversionResult(deck, "failed", \
+                time.perf_counter() - start_time, 0, 0, repr(convert_error))
+        self.results.append(result)
+        return result
+
+
+    def convert_all(self, paths):
+        decks = find_deck_names(paths)
+        # Decks given separately can still have the same name - neither is converted, rather
+        #  than one overwriting the other's output
+        deck_names = {}
+        for deck, deck_name in decks:
+            deck_names.setdefault(os.path.normcase(deck_name), []).append(deck)
+        clashes = [deck_list for deck_list in deck_names.values() if len(deck_list) > 1]
+        if clashes:
+            raise ValueError("Presentations would have the same output files: " + \
+                "; ".join(", ".join(deck_list) for deck_list in clashes))
+        return [self.convert(deck, deck_name) for deck, deck_name in decks]
+
+
+    def report(self):
+        total_time, total_pages, total_saved = 0, 0, 0
+        for result in self.results:
+            total_time += result.seconds
+            total_pages += result.pages
+            total_saved += result.saved_bytes
+            print("{0:<50} {1:<9} {2:>5} pages {3:>9.3f} s {4:>10} bytes saved".format(\
+                os.path.basename(result.deck), result.status, result.pages, result.seconds, \
+                result.saved_bytes))
+            if result.error:
+                print("    " + result.error)
+        status_counts = [str(sum(1 for result in self.results if result.status == status)) \
+            + " " + status for status in ["converted", "skipped", "failed"]]
+        print("{0:<60} {1:>5} pages {2:>9.3f} s {3:>10} bytes saved".format(\
+            ", ".join(status_counts), total_pages, total_time, total_saved))
+
+
+if __name__ == "__main__":
+    ARG_PARSER = argparse.ArgumentParser(\
+        description="Convert presentations to HTML5, skipping those that are up to date")
+    ARG_PARSER.add_argument("paths", nargs="+", help=".odp files or directories of them")
+    ARG_PARSER.add_argument("-o", "--output-dir", default=".", \
+        help="directory for the .html and .json output files")
+    ARG_PARSER.add_argument("-s", "--data-store", \
+        help="directory for extracted images (default: <output-dir>/store/)")
+    ARG_PARSER.add_argument("-w", "--workers", type=int, default=1, \
+        help="number of worker processes rendering pages (0 for one per CPU)")
+    ARG_PARSER.add_argument("-f", "--force", action="store_true", \
+        help="convert presentations even if their output is up to date")
+    ARG_PARSER.add_argument("-i", "--incremental", action="store_true", \
+        help="only render pages that have changed since the last conversion")
+    ARG_PARSER.add_argument("-p", "--split-pages", action="store_true", \
+        help="write each page to its own SVG file, loaded by the player when needed")
+    ARG_PARSER.add_argument("-d", "--precision", type=int, \
+        help="round numbers in the SVG output to this many decimal places")
+    ARG_PARSER.add_argument("-r", "--image-dpi", type=int, \
+        help="downscale images to this resolution at the size they are displayed")
+    ARG_PARSER.add_argument("-t", "--image-format", choices=["webp", "avif"], \
+        help="convert downscaled images to this format")
+    ARGS = ARG_PARSER.parse_args()
+    DATA_STORE = os.path.join(ARGS.data_store, "") if ARGS.data_store else None
+    with BatchConverter(ARGS.output_dir, DATA_STORE, ARGS.workers or None, ARGS.force, \
+        ARGS.incremental, ARGS.split_pages, ARGS.precision, ARGS.image_dpi, ARGS.image_format) \
+        as BATCH:
+        BATCH.convert_all(ARGS.paths)
+        BATCH.report()
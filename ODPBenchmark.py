@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import tempfile
+import time
+from lxml import etree
+from ODPBatch import find_decks
+from ODPPresentation import ODPPresentation
+from FillFactory import FillFactory, DPCM
+from EquationCompiler import EquationCompiler
+from ShapeParser import ShapeParser
+
+def time_deck(deck, out_dir, repeats, precision=None):
+    # Best of repeats parse and render time for a deck, plus its number of pages
+    best_time, page_count = None, 0
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        # Presentations print progress for every item, which would swamp the timings
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ODPPresentation(deck, os.path.join(out_dir, "store", ""), precision) as pres:
+                page_count = pres.parse(os.path.join(out_dir, "bench.html"), \
+                    os.path.join(out_dir, "bench.json"))
+        run_time = time.perf_counter() - start_time
+        if best_time is None or run_time < best_time:
+            best_time = run_time
+    return best_time, page_count
+
+
+def time_output_parse(html_file, repeats):
+    # Best of repeats time to parse the HTML output into a document tree, as a stand-in for
+    #  the browser's parse time
+    best_time = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        etree.parse(html_file, etree.HTMLParser())
+        run_time = time.perf_counter() - start_time
+        if best_time is None or run_time < best_time:
+            best_time = run_time
+    return best_time
+
+
+def run_benchmark(decks, repeats, precisions=None):
+    # Every deck is timed once for each output precision (None for full precision)
+    total_time, total_pages = 0, 0
+    with tempfile.TemporaryDirectory() as out_dir:
+        html_file = os.path.join(out_dir, "bench.html")
+        for deck in decks:
+            for precision in precisions or [None]:
+                deck_time, page_count = time_deck(deck, out_dir, repeats, precision)
+                total_time += deck_time
+                total_pages += page_count
+                print("{0:<36} {1:>4} {2:>5} pages {3:>8.3f} s {4:>7.2f} pages/s {5:>10} bytes " \
+                    "{6:>7.3f} s parse".format(os.path.basename(deck), \
+                    "full" if precision is None else precision, page_count, deck_time, \
+                    page_count / deck_time, os.path.getsize(html_file), \
+                    time_output_parse(html_file, repeats)))
+    if decks:
+        print("{0:<41} {1:>5} pages {2:>8.3f} s {3:>7.2f} pages/s".format(\
+            "Total", total_pages, total_time, total_pages / total_time))
+    # Caches are per process, and shared by every run of every deck
+    print("Equation cache: " + str(EquationCompiler.stats()))
+    print("Shape geometry cache: " + str(ShapeParser.geometry_stats()))
+
+
+def time_hatch(pres, build_hatch, repeats):
+    # Best of repeats time to build a hatch filled rectangle covering the page, write it out
+    #  and parse it back (as a stand-in for the browser's parse and render time), plus the
+    #  number of elements and bytes written
+    best_time, svg_str = None, ""
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        pres.start_fragment("bench_")
+        rect = pres.dwg.rect((0, 0), (pres.d_width, pres.d_height))
+        rect.fill(build_hatch().get_paint_server())
+        pres.dwg.add(rect)
+        svg_str = pres.dwg.tostring()
+        svg_root = etree.fromstring(svg_str.encode("utf-8"))
+        run_time = time.perf_counter() - start_time
+        if best_time is None or run_time < best_time:
+            best_time = run_time
+    return best_time, sum(1 for _ in svg_root.iter()), len(svg_str)
+
+
+def hatch_lines(dwg, pres, h_style, angle, h_dist, h_color, bg_color, e_width, e_height):
+    # Hatching drawn line by line across the whole element, as FillFactory drew it before
+    #  hatches were tiled, for comparison with FillFactory.hatch_pattern
+    pattern = dwg.pattern(insert=(0, 0), size=(e_width, e_height), \
+        patternUnits="userSpaceOnUse", patternContentUnits="userSpaceOnUse")
+    pattern.add(dwg.rect((0, 0), (e_width, e_height), fill=bg_color))
+    # Single line hatch
+    draw_hatching(dwg, pattern, angle, h_dist, h_color, 1/DPCM, e_width, e_height)
+    # Double line hatch
+    if h_style in ["double", "triple"]:
+        draw_hatching(dwg, pattern, angle + 90, h_dist, h_color, 1/DPCM, e_width, e_height)
+    # Triple line hatch
+    if h_style == "triple":
+        draw_hatching(dwg, pattern, angle + 135, h_dist, h_color, 1/DPCM, e_width, e_height)
+    return pres.add_def(pattern)
+
+
+def draw_hatching(dwg, pattern, angle, h_dist, h_color, h_width, e_width, e_height):
+    # Based on implementation from DrawHatch() and CalcHatchValues() in
+    # https://github.com/LibreOffice/core/blob/master/vcl/source/outdev/hatch.cxx
+
+    hatch_angle = angle % 180
+    if hatch_angle > 90:
+        hatch_angle -= 180
+
+    if hatch_angle == 0:
+        x_0, y_0 = 0, 0
+        x_1, y_1 = e_width, 0
+        while y_0 < e_height:
+            pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
+            y_0 += h_dist
+            y_1 += h_dist
+    elif hatch_angle == 90:
+        x_0, y_0 = 0, 0
+        x_1, y_1 = 0, e_height
+        while x_0 < e_width:
+            pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
+            x_0 += h_dist
+            x_1 += h_dist
+    elif -45 <= hatch_angle <= 45:
+        offset_y = e_width * math.tan(math.radians(abs(hatch_angle)))
+        if hatch_angle > 0:
+            x_0, y_0 = 0, 0
+            x_1, y_1 = e_width, -offset_y
+        else:
+            x_0, y_0 = 0, -offset_y
+            x_1, y_1 = e_width, 0
+        while y_0 < e_height or y_1 < e_height:
+            pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
+            y_0 += h_dist / math.cos(math.radians(abs(hatch_angle)))
+            y_1 += h_dist / math.cos(math.radians(abs(hatch_angle)))
+    else:
+        offset_x = e_height / math.tan(math.radians(abs(hatch_angle)))
+        if hatch_angle > 0:
+            x_0, y_0 = 0, 0
+            x_1, y_1 = -offset_x, e_height
+        else:
+            x_0, y_0 = -offset_x, 0
+            x_1, y_1 = 0, e_height
+        while x_0 < e_width or x_1 < e_width:
+            pattern.add(dwg.line((x_0, y_0), (x_1, y_1), stroke=h_color, stroke_width=h_width))
+            x_0 += h_dist / math.sin(math.radians(abs(hatch_angle)))
+            x_1 += h_dist / math.sin(math.radians(abs(hatch_angle)))
+
+
+def run_hatch_benchmark(deck, repeats, hatch_dist=0.2):
+    # Compare hatches tiled from a single period (hatch_pattern) with hatches drawn line by
+    #  line across the element (hatch_lines), for each hatch style at a range of angles
+    with tempfile.TemporaryDirectory() as out_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            pres = ODPPresentation(deck, os.path.join(out_dir, "store", ""))
+        with pres:
+            for h_style in ["single", "double", "triple"]:
+                for angle in [0, 30, 45, 90]:
+                    hatch_args = (pres.dwg, pres, h_style, angle, hatch_dist, "#000000", \
+                        "#ffffff", pres.d_width, pres.d_height)
+                    for method, build_hatch in [
+                            ("pattern", lambda: FillFactory.hatch_pattern(*hatch_args)), \
+                            ("lines", lambda: hatch_lines(*hatch_args))]:
+                        hatch_time, elt_count, byte_count = time_hatch(pres, build_hatch, repeats)
+                        print("{0:<7} {1:>3} deg {2:<8} {3:>7} elements {4:>10} bytes " \
+                            "{5:>8.4f} s".format(h_style, angle, method, elt_count, byte_count, \
+                            hatch_time))
+
+
+if __name__ == "__main__":
+    ARG_PARSER = argparse.ArgumentParser(\
+        description="Time parsing and rendering of a corpus of presentations")
+    ARG_PARSER.add_argument("paths", nargs="+", help=".odp files or directories of them")
+    ARG_PARSER.add_argument("-r", "--repeats", type=int, default=3, \
+        help="number of runs per presentation (the best is reported)")
+    ARG_PARSER.add_argument("-d", "--precisions", type=int, nargs="+", \
+        help="output precisions (decimal places) to compare with full precision output")
+    ARG_PARSER.add_argument("-H", "--hatches", action="store_true", \
+        help="compare tiled and line by line hatch fills, on the page size of the first deck")
+    ARGS = ARG_PARSER.parse_args()
+    if ARGS.hatches:
+        run_hatch_benchmark(find_decks(ARGS.paths)[0], ARGS.repeats)
+    else:
+        run_benchmark(find_decks(ARGS.paths), ARGS.repeats, \
+            [None] + ARGS.precisions if ARGS.precisions else None)
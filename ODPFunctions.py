@@ -2,12 +2,49 @@
 # pylint: disable=C0103 # Snake-case naming convention
 # pylint: disable=R0903 # Too few public methods
 
+import itertools
 import re
 
 ROMAN_C = ['', 'c', 'cc', 'ccc', 'cd', 'd', 'dc', 'dcc', 'dccc', 'cm']
 ROMAN_X = ['', 'x', 'xx', 'xxx', 'xl', 'l', 'lx', 'lxx', 'lxxx', 'xc']
 ROMAN_I = ['', 'i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix']
 LETTERS = "abcdefghijklmnopqrstuvwxyz"
+# Decimal numbers (not part of a name, colour or longer number, but maybe followed by a unit),
+#  and the XML tags they are rounded in by round_numbers
+NUMBER_PATTERN = re.compile(\
+    r'(?<![\w.#])-?(?:\d+\.\d+(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+)(?![\d.])')
+TAG_PATTERN = re.compile(r'<[^>]*>')
+ATTR_PATTERN = re.compile(r'(\s([\w:-]+)=")([^"]*)"')
+# Attributes holding coordinates, lengths and other numbers that can be rounded - anything else
+#  (hrefs, ids, text...) may contain digits that aren't numbers, so is left alone
+ROUNDED_ATTRS = {"x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "dx", "dy", \
+    "width", "height", "d", "points", "transform", "patternTransform", "gradientTransform", \
+    "viewBox", "from", "to", "by", "values", "offset", "refX", "refY", "markerWidth", \
+    "markerHeight", "style", "stroke-width", "stroke-dasharray", "stroke-dashoffset", \
+    "stroke-opacity", "fill-opacity", "stop-opacity", "opacity", "font-size"}
+TRANSFORM_ATTRS = {"transform", "patternTransform", "gradientTransform"}
+TRANSFORM_PATTERN = re.compile(r'(\w+)(\s*\([^)]*\))')
+# Scale factors (e.g. of viewBox units, about 0.001) and stroke widths (as little as 1/DPCM) can
+#  be smaller than the precision, so keep this many significant digits more than it instead of
+#  rounding them to decimal places
+EXTRA_DIGITS = 3
+ODF_NAMESPACES = {
+    "office": "urn:oasis:names:tc:opendocument:xmlns:office:1.0",
+    "style": "urn:oasis:names:tc:opendocument:xmlns:style:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+    "draw": "urn:oasis:names:tc:opendocument:xmlns:drawing:1.0",
+    "fo": "urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0",
+    "xlink": "http://www.w3.org/1999/xlink",
+    "svg": "urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0",
+    "presentation": "urn:oasis:names:tc:opendocument:xmlns:presentation:1.0",
+    "smil": "urn:oasis:names:tc:opendocument:xmlns:smil-compatible:1.0",
+    "anim": "urn:oasis:names:tc:opendocument:xmlns:animation:1.0",
+    "xml": "http://www.w3.org/XML/1998/namespace"}
+
+def odf_tag(qname):
+    # Convert a prefixed ODF name (e.g. "draw:page") to lxml's {namespace}name form
+    prefix, local_name = qname.split(":")
+    return "{" + ODF_NAMESPACES[prefix] + "}" + local_name
 
 def units_to_float(unit_str):
     return float(re.sub(r'[^0-9.\-]', '', unit_str))
@@ -15,6 +52,62 @@ def units_to_float(unit_str):
 def units_to_int(unit_str):
     return int(re.sub(r'[^0-9.\-]', '', unit_str))
 
+def round_number(number_str, precision):
+    # Shortest form of the number rounded to precision decimal places, e.g. 3.2500000000000004
+    #  is 3.25 and 2.0 is 2
+    rounded = round(float(number_str), precision)
+    if rounded.is_integer():
+        return str(int(rounded))
+    return repr(rounded)
+
+def round_significant(number_str, precision):
+    # Shortest form of the number rounded to precision + EXTRA_DIGITS significant digits
+    rounded = float(format(float(number_str), "." + str(precision + EXTRA_DIGITS) + "g"))
+    if rounded.is_integer():
+        return str(int(rounded))
+    return repr(rounded)
+
+def round_numbers(xml_str, precision):
+    # Round the numbers in the numeric attributes (ROUNDED_ATTRS) of serialized SVG - text
+    #  content is left alone, as it is escaped so that '<' always starts a tag
+    if precision is None:
+        return xml_str
+    return TAG_PATTERN.sub(lambda tag: ATTR_PATTERN.sub(\
+        lambda attr: round_attr(attr, precision), tag.group(0)), xml_str)
+
+def round_attr(attr, precision):
+    attr_name, attr_value = attr.group(2), attr.group(3)
+    if attr_name not in ROUNDED_ATTRS:
+        return attr.group(0)
+    if attr_name in TRANSFORM_ATTRS:
+        attr_value = TRANSFORM_PATTERN.sub(\
+            lambda transform: round_transform(transform, precision), attr_value)
+    elif attr_name == "style":
+        attr_value = ";".join(round_declaration(declaration, precision) \
+            for declaration in attr_value.split(";"))
+    elif attr_name == "stroke-width":
+        attr_value = round_all(attr_value, precision, round_significant)
+    else:
+        attr_value = round_all(attr_value, precision, round_number)
+    return attr.group(1) + attr_value + '"'
+
+def round_all(value_str, precision, round_func):
+    return NUMBER_PATTERN.sub(lambda number: round_func(number.group(0), precision), value_str)
+
+def round_transform(transform, precision):
+    # Translations (the last two numbers of a matrix) are coordinates, but the other numbers of
+    #  scale and matrix transforms are factors
+    func_name, args = transform.group(1), transform.group(2)
+    factor_count = {"scale": 2, "matrix": 4}.get(func_name, 0)
+    arg_indices = itertools.count()
+    return func_name + NUMBER_PATTERN.sub(lambda number: (round_significant \
+        if next(arg_indices) < factor_count else round_number)(number.group(0), precision), args)
+
+def round_declaration(declaration, precision):
+    if declaration.partition(":")[0].strip() == "stroke-width":
+        return round_all(declaration, precision, round_significant)
+    return round_all(declaration, precision, round_number)
+
 def int_to_roman(val, uppercase):
     roman_str = "m" * int(val / 1000)
     val = val % 1000
@@ -1,52 +1,228 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=C0103 # Snake-case naming convention
 
+import contextlib
+import hashlib
+import itertools
 import json
-import zipfile
+import os
+import re
+import tempfile
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
 import svgwrite
-from bs4 import BeautifulSoup
-from PIL import Image
-from matplotlib import font_manager
+from lxml import etree
 from FillFactory import FillFactory
+from ODPArchive import ODPArchive
+from AssetStore import AssetStore
 from ShapeParser import ShapeParser
 from StrokeFactory import StrokeFactory
 from TextBoxParser import TextBoxParser
 from AnimationFactory import AnimationFactory
-from ODPFunctions import units_to_float
+from StyleRegistry import StyleRegistry
+from FontCache import FontCache
+from FontIndex import FontIndex
+from ODFTree import ODFElement, parse_xml
+from PageCache import PageCache
+from ODPFunctions import units_to_float, odf_tag, round_numbers
 
 DPCM = 37.7953
+# Rendered pages held back (e.g. waiting for earlier pages from the pool) before being written
+MAX_PENDING_PAGES = 32
+SPOOL_BLOCK_SIZE = 1 << 20
+
+# Rendered page (or master page) - its defs (a list, one per definition), background and layer
+#  as serialized SVG, its page JSON data, the number of bytes saved by sharing repeated shapes
+#  and the asset index entries added while rendering it (so that entries added in a worker
+#  process reach the presentation's index)
+PageFragment = namedtuple("PageFragment", \
+    ["defs", "background", "layer", "json", "saved_bytes", "asset_index"])
+
+# References to generated definitions (url(#...) and href="#..."), and the id of a definition
+DEF_REF_PATTERN = re.compile(r'#((?:page_\d+_|master_)d\d+)(?!\w)')
+DEF_ID_PATTERN = re.compile(r' id="([^"]*)"')
+
+# Presentation opened by a worker process, reused for every page it renders from that file
+WORKER_PRES = None
+
+def render_page_worker(url, data_store, options, page_xml, idx):
+    # options are the presentation's output options (precision, image_dpi and image_format)
+    global WORKER_PRES # pylint: disable=W0603
+    if WORKER_PRES is None or (WORKER_PRES.url, WORKER_PRES.data_store, WORKER_PRES.options()) \
+        != (url, data_store, options):
+        if WORKER_PRES:
+            WORKER_PRES.close()
+        WORKER_PRES = ODPPresentation(url, data_store, *options)
+    return WORKER_PRES.generate_page(ODFElement(etree.fromstring(page_xml)), idx)
+
+
+class SharedDefs():
+
+    def __init__(self):
+        # Ids of the definitions already written, keyed by a hash of their SVG without the id
+        self.def_ids = {}
+
+
+    @staticmethod
+    def rename_refs(xml_str, id_map):
+        return DEF_REF_PATTERN.sub(\
+            lambda def_ref: "#" + id_map.get(def_ref.group(1), def_ref.group(1)), xml_str)
+
+
+    def merge(self, fragment, register=True):
+        # Remove definitions that are identical to ones already written (e.g. on an earlier
+        #  page), referring to the earlier ones instead. If register is False, the fragment's
+        #  own definitions aren't made available to later fragments, as when pages are
+        #  loaded separately and in any order
+        id_map = {}
+        def_chunks = []
+        for def_xml in fragment.defs:
+            if id_map:
+                def_xml = SharedDefs.rename_refs(def_xml, id_map)
+            id_match = DEF_ID_PATTERN.search(def_xml, 0, def_xml.index(">"))
+            if id_match is None:
+                def_chunks.append(def_xml)
+                continue
+            def_hash = hashlib.sha1((def_xml[:id_match.start()] + \
+                def_xml[id_match.end():]).encode()).hexdigest()
+            if def_hash in self.def_ids:
+                id_map[id_match.group(1)] = self.def_ids[def_hash]
+            else:
+                if register:
+                    self.def_ids[def_hash] = id_match.group(1)
+                def_chunks.append(def_xml)
+        if not id_map:
+            return fragment._replace(defs=def_chunks)
+        return fragment._replace(defs=def_chunks, \
+            background=SharedDefs.rename_refs(fragment.background, id_map), \
+            layer=SharedDefs.rename_refs(fragment.layer, id_map))
+
 
 class ODPPresentation:
 
-    def __init__(self, url, data_store):
+    def __init__(self, url, data_store, precision=None, image_dpi=None, image_format=None):
+        # If precision is given, numbers in the SVG output are rounded to that many decimal
+        #  places (otherwise they are written in full). If image_dpi is given, images are
+        #  downscaled to that resolution at their displayed size, and cropped to their clip
+        #  area (see AssetStore)
         self.url = url
         self.data_store = data_store
-        pres_archive = zipfile.ZipFile(url, 'r')
-        self.styles = BeautifulSoup(pres_archive.read('styles.xml'), \
-            "lxml", from_encoding='UTF-8')
-        self.content = BeautifulSoup(pres_archive.read('content.xml'), \
-            "lxml", from_encoding='UTF-8')
-        self.font_mgr = font_manager.FontManager()
+        self.precision = precision
+        # Archive is kept open for the lifetime of the presentation and shared by all factories
+        self.archive = ODPArchive(url)
+        self.assets = AssetStore(self.archive, data_store, image_dpi, image_format)
+        with self.archive.open('styles.xml') as styles_file:
+            self.styles = parse_xml(styles_file)
+        # Only the automatic styles of content.xml are kept in memory, pages are streamed
+        #  one at a time by iter_pages
+        self.content_styles = self.read_content_styles()
+        self.styles_registry = StyleRegistry(self.styles)
+        self.content_registry = StyleRegistry(self.content_styles, self.styles_registry)
+        self.font_index = FontIndex.shared()
+        self.font_cache = FontCache.shared(self.font_index)
         self.animator = AnimationFactory()
         self.xml_ids = {}
+        self.shape_instances = {}
+        self.def_elts = {}
+        # Bytes saved by sharing repeated shapes, in the last call to parse
+        self.saved_bytes = 0
 
         # Create SVG drawing of correct size
-        drawing_size = self.get_document_size()
-        self.d_width = units_to_float(str(drawing_size[0]))
-        self.d_height = units_to_float(str(drawing_size[1]))
+        self.drawing_size = self.get_document_size()
+        self.d_width = units_to_float(str(self.drawing_size[0]))
+        self.d_height = units_to_float(str(self.drawing_size[1]))
         self.view_box = '0 0 ' + str(self.d_width) + ' ' + str(self.d_height)
-        self.dwg = svgwrite.Drawing(size=drawing_size, viewBox=(self.view_box))
+        self.dwg = self.new_drawing()
 
         # Setup iterative variables
-        self.clip_id = 0
+        self.id_prefix = ""
+        self.def_id = 0
+        self.sub_g = 0
+
+
+    def options(self):
+        return (self.precision, self.assets.image_dpi, self.assets.image_format)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        self.assets.close()
+        self.archive.close()
+
+
+    def read_content_styles(self):
+        with self.archive.open('content.xml') as content_file:
+            for _, styles_elt in etree.iterparse(content_file, events=("end",), \
+                tag=odf_tag("office:automatic-styles")):
+                # Parsing stops here, so the document holds nothing after the styles
+                return ODFElement(styles_elt.getparent())
+        return ODFElement(etree.Element(odf_tag("office:document-content")))
+
+
+    def iter_pages(self):
+        # Stream content.xml, yielding one draw:page at a time, so that memory use is bounded
+        #  by the largest page rather than the whole document
+        with self.archive.open('content.xml') as content_file:
+            for _, elt in etree.iterparse(content_file, events=("end",), \
+                tag=[odf_tag("office:automatic-styles"), odf_tag("draw:page")]):
+                if elt.tag == odf_tag("draw:page"):
+                    yield ODFElement(elt)
+                # Release the element (and any already rendered pages before it)
+                elt.clear()
+                while elt.getprevious() is not None:
+                    del elt.getparent()[0]
+
+
+    def new_drawing(self):
+        return svgwrite.Drawing(size=self.drawing_size, viewBox=(self.view_box))
+
+
+    def start_fragment(self, id_prefix):
+        # Each page is rendered into a drawing of its own, with every generated id prefixed
+        #  by the page id, so that pages can be rendered in any process and merged afterwards
+        self.dwg = self.new_drawing()
+        self.id_prefix = id_prefix
+        self.def_id = 0
         self.sub_g = 0
+        self.xml_ids = {}
+        self.shape_instances = {}
+        self.def_elts = {}
+        self.animator.start_page(id_prefix)
+
+
+    def next_def_id(self):
+        def_id = self.id_prefix + "d" + str(self.def_id)
+        self.def_id += 1
+        return def_id
+
+
+    def add_def(self, def_elt):
+        # Add a (complete) definition - gradient, pattern, marker, clip path... - to the defs,
+        #  unless an identical one is already there. Returns the definition to refer to
+        def_elt.attribs.pop("id", None)
+        def_key = def_elt.tostring()
+        if def_key not in self.def_elts:
+            def_elt["id"] = self.next_def_id()
+            self.dwg.defs.add(def_elt)
+            self.def_elts[def_key] = def_elt
+        return self.def_elts[def_key]
+
+
+    def defs_fragment(self):
+        return [self.round_output(def_elt.tostring()) for def_elt in self.dwg.defs.elements]
 
 
     def get_document_size(self):
-        mp_tag = self.styles.find("office:master-styles").find("style:master-page")
+        mp_tag = self.styles_registry.first_master_page()
         page_layout = mp_tag.get("style:page-layout-name")
-        pl_tag = self.styles.find("office:automatic-styles")\
-            .find({"style:page-layout"}, {"style:name": page_layout})
+        pl_tag = self.styles_registry.page_layout(page_layout)
         page_height = pl_tag.find("style:page-layout-properties")["fo:page-height"]
         page_width = pl_tag.find("style:page-layout-properties")["fo:page-width"]
         return (page_width, page_height)
@@ -78,38 +254,39 @@ class ODPPresentation:
         # TODO: draw:frame might contain something other than an image...
         clip_area = None
         if "draw:style-name" in frame_attrs:
-            style_tag = style_src.find("office:automatic-styles")\
-                .find({"style:style"}, {"style:name": frame_attrs["draw:style-name"]})\
-                .find("style:graphic-properties")
-            if style_tag and "fo:clip" in style_tag.attrs:
-                clip_area = style_tag["fo:clip"]
+            clip_area = style_src.computed_style(frame_attrs["draw:style-name"])\
+                .graphic.get("fo:clip")
         if item.find("draw:image"):
             print("add image")
             image_href = item.find("draw:image").attrs["xlink:href"]
             # Extract image to data store
-            pres_archive = zipfile.ZipFile(self.url, 'r')
-            pres_archive.extract(image_href, self.data_store)
+            image_url = self.assets.asset_url(image_href)
+            clip = None
             if clip_area and clip_area[0:4] == "rect":
                 clip = [units_to_float(x) for x in clip_area[5:-1].split(", ")]
-                clip_path = self.dwg.defs.add(\
-                    self.dwg.clipPath(id="clip" + str(self.clip_id)))
+            # fo:clip is part of the frame's style, so never changes - a derivative of the
+            #  image can be cropped to it, rather than clipping the whole image
+            derived_url = self.assets.image_url(image_href, (frame_w, frame_h), clip)
+            if clip and not derived_url:
+                clip_path = self.dwg.clipPath()
                 clip_path.add(self.dwg.rect(
                     insert=(frame_x, frame_y), size=(frame_w, frame_h)))
-                img_px = Image.open(self.data_store + image_href).size
+                clip_path = self.add_def(clip_path)
+                image_info = self.assets.image_info(image_href)
+                img_px = (image_info.width, image_info.height)
                 img_w = frame_w * img_px[0] / (img_px[0] - DPCM * (clip[1] + clip[3]))
                 img_h = frame_h * img_px[1] / (img_px[1] - DPCM * (clip[0] + clip[2]))
                 img_x = frame_x - \
                     (frame_w * DPCM * clip[3] / (img_px[0] - DPCM * (clip[1] + clip[3])))
                 img_y = frame_y - \
                     (frame_h * DPCM * clip[0] / (img_px[1] - DPCM * (clip[0] + clip[2])))
-                clip_img = self.dwg.image(self.data_store + image_href,\
+                clip_img = self.dwg.image(image_url,\
                     insert=(img_x, img_y), size=(img_w, img_h),\
                     preserveAspectRatio="none",\
-                    clip_path="url(#clip" + str(self.clip_id) + ")")
+                    clip_path=clip_path.get_funciri())
                 layer_g.add(clip_img)
-                self.clip_id += 1
             else:
-                clip_img = self.dwg.image(self.data_store + image_href,\
+                clip_img = self.dwg.image(derived_url or image_url,\
                     insert=(frame_x, frame_y), size=(frame_w, frame_h),\
                     preserveAspectRatio="none")
                 layer_g.add(clip_img)
@@ -130,15 +307,12 @@ class ODPPresentation:
             else:
                 tb_style_name = None
             if tb_style_name:
-                frame_style = style_src.find("office:automatic-styles")\
-                    .find({"style:style"}, {"style:name": tb_style_name})
-                frame_graphics = frame_style.find({"style:graphic-properties"})
-                FillFactory.fill(self.dwg, tb_rect, self, frame_attrs, frame_w, frame_h, \
-                    frame_style)
+                frame_style = style_src.computed_style(tb_style_name)
+                FillFactory.fill(self.dwg, tb_rect, self, frame_style, frame_w, frame_h)
                 layer_g.add(tb_rect)
-                if "draw:textarea-vertical-align" in frame_graphics.attrs:
-                    vert_align = frame_graphics["draw:textarea-vertical-align"]
-            tb_parser = TextBoxParser(self.dwg, self, item, self.font_mgr, vert_align, style_src)
+                if "draw:textarea-vertical-align" in frame_style.graphic:
+                    vert_align = frame_style.graphic["draw:textarea-vertical-align"]
+            tb_parser = TextBoxParser(self.dwg, self, item, self.font_cache, vert_align, style_src)
             tb_parser.visit_textbox(layer_g, "textbox")
 
 
@@ -233,11 +407,9 @@ class ODPPresentation:
 
         polygon_scale = polygon_w / (polygon_vb[2]-polygon_vb[0])
         polygon.scale(polygon_scale)
-        style_tag = style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": item["draw:style-name"]})
-        attrs = style_tag.find("style:graphic-properties").attrs
-        FillFactory.fill(self.dwg, polygon, self, attrs, \
-            polygon_w/polygon_scale, polygon_h/polygon_scale, style_tag)
+        polygon_style = style_src.computed_style(item["draw:style-name"])
+        FillFactory.fill(self.dwg, polygon, self, polygon_style, \
+            polygon_w/polygon_scale, polygon_h/polygon_scale)
         StrokeFactory.stroke(self, self.dwg, item, polygon, 1/polygon_scale, style_src)
         if "xml:id" in item.attrs:
             self.xml_ids["obj_"+item["xml:id"]] = {
@@ -275,7 +447,7 @@ class ODPPresentation:
                 self.parse_item_group(sub_items, sub_group, style_src)
 
 
-    def parse_page_animations(self, timing_root, json_data, page_json_data):
+    def parse_page_animations(self, timing_root, page_json_data):
         main_seq = timing_root.find("anim:seq")
         click_anims = main_seq.findChildren({"anim:par"}, recursive=False)
         # Keep track of initially hidden and visible elements that have associated animations
@@ -325,106 +497,227 @@ class ODPPresentation:
         page_json_data["init_visible"] = init_visible
 
 
-    def generate_page(self, page, layer_g, layer_bg, on_first_page, json_data):
+    def round_output(self, xml_str):
+        # Every page's SVG is rounded here, so the precision applies to all of the emitters
+        return round_numbers(xml_str, self.precision)
+
+
+    def generate_page(self, page, idx):
+        page_id = 'page_' + str(idx)
+        self.start_fragment(page_id + "_")
+        if idx == 0:
+            display_style = "display:block;"
+        else:
+            display_style = "display:none;"
+        page_layer = self.dwg.g(id=page_id, style=display_style)
+
         # Generate background, if not using master background
+        page_bg = ""
         page_style = page.get("draw:style-name")
-        page_style_tag = self.content.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": page_style})
-        attrs = page_style_tag.find("style:drawing-page-properties").attrs
-        if "draw:fill" in attrs:
-            if on_first_page:
-                display_style = "display:block;"
-            else:
-                display_style = "display:none;"
+        page_style_tag = self.content_registry.computed_style(page_style)
+        if "draw:fill" in page_style_tag.drawing_page:
             bg_rect = self.dwg.rect(insert=(0, 0), size=(self.d_width, self.d_height),\
-                style=display_style, id=layer_g.__getitem__("id")+"_bg")
-            FillFactory.fill(self.dwg, bg_rect, self, attrs, self.d_width, self.d_height, \
-                page_style_tag)
-            layer_bg.add(bg_rect)
+                style=display_style, id=page_id + "_bg")
+            FillFactory.fill(self.dwg, bg_rect, self, page_style_tag, self.d_width, self.d_height)
+            page_bg = bg_rect.tostring()
 
         page_items = page.find_all(recursive=False)
-        self.sub_g = 0
-        self.xml_ids = {}
-        self.parse_item_group(page_items, layer_g, self.content)
+        self.parse_item_group(page_items, page_layer, self.content_registry)
+        saved_bytes = ShapeParser.share_shapes(self)
 
         page_json_data = {}
-        page_json_data["page_id"] = layer_g.__getitem__('id')
+        page_json_data["page_id"] = page_id
         page_json_data["init_hidden"] = []
         page_json_data["animations"] = []
         timing_root = page.find({"anim:par"})
         if timing_root:
-            self.parse_page_animations(timing_root, json_data, page_json_data)
-        # Store page JSON data
-        json_data["pages"].append(page_json_data)
+            self.parse_page_animations(timing_root, page_json_data)
+        return PageFragment(self.defs_fragment(), self.round_output(page_bg), \
+            self.round_output(page_layer.tostring()), page_json_data, saved_bytes, \
+            self.assets.pop_new_entries())
 
 
-    def generate_master_page(self, mp_name, layer_m, layer_obj):
-        m_page = self.styles.find("office:master-styles")\
-            .find({"style:master-page"}, {"style:name": mp_name})
+    def generate_master_page(self, mp_name):
+        m_page = self.styles_registry.master_page(mp_name)
+        self.start_fragment("master_")
 
         # Generate background
+        layer_m = self.dwg.g(id='master_bg')
         draw_style = m_page.get("draw:style-name")
-        style_tag = self.styles.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": draw_style})
-        attrs = style_tag.find("style:drawing-page-properties").attrs
+        style_tag = self.styles_registry.computed_style(draw_style)
         bg_rect = self.dwg.rect((0, 0), (self.d_width, self.d_height))
-        FillFactory.fill(self.dwg, bg_rect, self, attrs, self.d_width, self.d_height, style_tag)
+        FillFactory.fill(self.dwg, bg_rect, self, style_tag, self.d_width, self.d_height)
         layer_m.add(bg_rect)
 
         # Generate master page objects
+        layer_obj = self.dwg.g(id='master_obj')
         m_page_items = m_page.find_all(recursive=False)
-        self.sub_g = 0
-        self.parse_item_group(m_page_items, layer_obj, self.styles)
-
-
-    def parse(self, html_file, json_file):
-
+        self.parse_item_group(m_page_items, layer_obj, self.styles_registry)
+        saved_bytes = ShapeParser.share_shapes(self)
+        return PageFragment(self.defs_fragment(), self.round_output(layer_m.tostring()), \
+            self.round_output(layer_obj.tostring()), None, saved_bytes, \
+            self.assets.pop_new_entries())
+
+
+    def generate_pages(self, pool, page_cache=None):
+        # Render pages in this process, or in the pool's worker processes when there is a pool.
+        #  Either way the fragments are yielded in page order, with at most MAX_PENDING_PAGES
+        #  waiting to be yielded. Pages that are unchanged since they were stored in
+        #  page_cache are reused rather than rendered
+        pending = deque()
+        for idx, page in enumerate(self.iter_pages()):
+            fingerprint, cached_page = None, None
+            if page_cache:
+                fingerprint = PageCache.fingerprint(self, page, idx)
+                cached_page = page_cache.get(fingerprint, self.data_store)
+            if cached_page:
+                pending.append((fingerprint, PageFragment(**cached_page)))
+            elif pool is None:
+                pending.append((fingerprint, self.generate_page(page, idx)))
+            else:
+                pending.append((fingerprint, pool.submit(render_page_worker, self.url, \
+                    self.data_store, self.options(), etree.tostring(page.element), idx)))
+            while len(pending) > MAX_PENDING_PAGES or (pending and pool is None):
+                yield self.finish_page(pending.popleft(), page_cache)
+        while pending:
+            yield self.finish_page(pending.popleft(), page_cache)
+        if page_cache:
+            page_cache.prune()
+
+
+    @staticmethod
+    def finish_page(pending_page, page_cache):
+        fingerprint, page = pending_page
+        if isinstance(page, Future):
+            page = page.result()
+        if page_cache:
+            page_cache.put(fingerprint, page._asdict())
+        return page
+
+
+    @staticmethod
+    def iter_element(element, chunks):
+        # Serialize an (empty) element around serialized children as they are produced, as
+        #  svgwrite would serialize it
+        empty_xml = element.tostring()
+        is_empty = True
+        for chunk in chunks:
+            if chunk:
+                if is_empty:
+                    yield empty_xml[:-3] + ">"
+                    is_empty = False
+                yield chunk
+        if is_empty:
+            yield empty_xml
+        else:
+            yield "</" + element.elementname + ">"
+
+
+    @staticmethod
+    def iter_spool(spool_file):
+        # Read back a spool file written earlier, a block at a time
+        spool_file.seek(0)
+        return iter(lambda: spool_file.read(SPOOL_BLOCK_SIZE), "")
+
+
+    def iter_svg(self, defs, background, page_bgs, layers):
+        # Serialize an SVG document from fragments - defs, the master page background, page
+        #  backgrounds and then the master page objects and page layers
+        svg_root = self.new_drawing()
+        # Children are added as serialized fragments
+        del svg_root.elements[:]
+        return ODPPresentation.iter_element(svg_root, itertools.chain(
+            ODPPresentation.iter_element(svg_root.defs, defs),
+            [background],
+            ODPPresentation.iter_element(svg_root.g(id='ind_page_bgs'), page_bgs),
+            layers))
+
+
+    def write_svg(self, svg_file, svg_chunks):
+        with open(svg_file, 'w', encoding='ascii', errors='xmlcharrefreplace') as svg_out:
+            for chunk in svg_chunks:
+                svg_out.write(chunk)
+
+
+    def parse(self, html_file, json_file, workers=1, pool=None, incremental=False, \
+        split_pages=False):
+        # Pages are rendered by pool if given, otherwise by a new pool of worker processes
+        #  (one per CPU if workers is None), or in this process if workers is 1.
+        #  If incremental, rendered pages are cached next to json_file and only pages that
+        #  have changed since the last run are rendered again.
+        #  If split_pages, the HTML file only holds the master page, and the defs it uses and
+        #  each page are written to SVG files in <html name>_pages/ for the player to load
         json_data = {}
         json_data["html_file"] = html_file
         json_data["pages"] = []
 
-        # Create master page background
-        bg_layer = self.dwg.g(id='master_bg')
-        page_bgs = self.dwg.g(id='ind_page_bgs')
-        bg_objs = self.dwg.g(id='master_obj')
-
         # At present just do the master page associated with the first page
         # TODO: Review this later and adjust as needed...!
-        self.generate_master_page('Default', bg_layer, bg_objs)
-        self.dwg.add(bg_layer)
-        self.dwg.add(page_bgs)
-        self.dwg.add(bg_objs)
-
-        # Process pages
-        page_ids = []
-        pages = self.content.find_all({"draw:page"})
-        first_page = True
-        for idx, page in enumerate(pages):
-            if first_page:
-                page_layer = self.dwg.g(id='page_' + str(idx), style="display:block;")
-                self.generate_page(page, page_layer, page_bgs, first_page, json_data)
-                first_page = False
+        # Definitions repeated on several pages are only written once - when pages are split,
+        #  only the master page's definitions can be shared, as they are loaded first
+        shared_defs = SharedDefs()
+        master_page = shared_defs.merge(self.generate_master_page('Default'))
+        self.saved_bytes = master_page.saved_bytes
+        self.assets.merge_entries(master_page.asset_index)
+
+        page_cache = None
+        if incremental:
+            page_cache = PageCache(os.path.splitext(json_file)[0] + "_pages.cache")
+        if split_pages:
+            pages_dir = os.path.splitext(html_file)[0] + "_pages"
+            # Files are referenced relative to the HTML file
+            pages_url = os.path.basename(pages_dir) + "/"
+            os.makedirs(pages_dir, exist_ok=True)
+            self.write_svg(os.path.join(pages_dir, "defs.svg"), \
+                self.iter_svg(master_page.defs, "", [], []))
+            json_data["defs_file"] = pages_url + "defs.svg"
+
+        # Process pages as they are rendered - page defs and layers are spooled to temporary
+        #  files (page backgrounds are small enough to keep) until the HTML file is written
+        page_bgs = []
+        with contextlib.ExitStack() as page_stack:
+            if pool is None and workers != 1:
+                pool = page_stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            defs_spool = page_stack.enter_context(tempfile.TemporaryFile('w+', \
+                encoding='ascii', errors='xmlcharrefreplace'))
+            layers_spool = page_stack.enter_context(tempfile.TemporaryFile('w+', \
+                encoding='ascii', errors='xmlcharrefreplace'))
+            for page in self.generate_pages(pool, page_cache):
+                self.saved_bytes += page.saved_bytes
+                self.assets.merge_entries(page.asset_index)
+                page = shared_defs.merge(page, not split_pages)
+                page_json_data = dict(page.json)
+                json_data["pages"].append(page_json_data)
+                if split_pages:
+                    page_file = page_json_data["page_id"] + ".svg"
+                    self.write_svg(os.path.join(pages_dir, page_file), \
+                        self.iter_svg(page.defs, "", [page.background], [page.layer]))
+                    page_json_data["page_file"] = pages_url + page_file
+                else:
+                    defs_spool.write("".join(page.defs))
+                    page_bgs.append(page.background)
+                    layers_spool.write(page.layer)
+
+            # Output HTML file and associated JSON transition data file
+            page_ids = [page_json_data["page_id"] for page_json_data in json_data["pages"]]
+            if split_pages:
+                svg_chunks = self.iter_svg([], master_page.background, [], [master_page.layer])
             else:
-                page_layer = self.dwg.g(id='page_' + str(idx), style="display:none;")
-                self.generate_page(page, page_layer, page_bgs, first_page, json_data)
-            self.dwg.add(page_layer)
-            page_ids.append('page_' + str(idx))
-
-        html_output = "<div>"
-        for p_id in page_ids:
-            html_output += "<button onclick=showGroup(\"" + str(p_id) + "\")>" + p_id + "</button>"
-        html_output += "</div>"
-        html_output += self.dwg.tostring()
-
-        # Output HTML file and associated JSON transition data file
-        self.to_html(html_file, html_output)
+                # Merge the fragments in page order
+                svg_chunks = self.iter_svg(\
+                    itertools.chain(master_page.defs, ODPPresentation.iter_spool(defs_spool)), \
+                    master_page.background, page_bgs, \
+                    itertools.chain([master_page.layer], ODPPresentation.iter_spool(layers_spool)))
+            self.to_html(html_file, page_ids, svg_chunks)
         with open(json_file, 'w') as json_out:
             json.dump(json_data, json_out, indent=2)
+        return len(json_data["pages"])
 
 
-    def to_html(self, html_file, data):
-        out_file = open(html_file, 'w', encoding='ascii', errors='xmlcharrefreplace')
-        out_file.write('''<!DOCTYPE html>
+    def to_html(self, html_file, page_ids, svg_chunks):
+        # The document is written as it is produced, rather than built up in memory
+        with open(html_file, 'w', encoding='ascii', errors='xmlcharrefreplace') as out_file:
+            out_file.write('''<!DOCTYPE html>
 <html>
     <head>
         <title>SVG test</title>
@@ -434,13 +727,18 @@ class ODPPresentation:
     </head>
     <body>
 ''')
-        out_file.write(data)
-        out_file.write('''
+            out_file.write("<div>")
+            for p_id in page_ids:
+                out_file.write("<button onclick=showGroup(\"" + str(p_id) + "\")>" + p_id + \
+                    "</button>")
+            out_file.write("</div>")
+            for chunk in svg_chunks:
+                out_file.write(chunk)
+            out_file.write('''
     </body>
 </html>''')
-        out_file.close()
 
 
 if __name__ == "__main__":
-    ODP_PRES = ODPPresentation('./files/anim_timing.odp', './store/')
-    ODP_PRES.parse('./test.html', './test.json')
+    with ODPPresentation('./files/anim_timing.odp', './store/') as ODP_PRES:
+        ODP_PRES.parse('./test.html', './test.json')
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import hashlib
+import json
+import os
+import re
+from lxml import etree
+
+CACHE_VERSION = 5
+HREF_PATTERN = re.compile(r'href="([^"]*)"')
+# Attributes naming another element that affects how a page is rendered, and the kind of
+#  element named (see StyleRegistry.INDEXED_ELEMENTS)
+REFERENCE_ATTRS = {
+    "draw:style-name": ["style"],
+    "presentation:style-name": ["style"],
+    "draw:text-style-name": ["style"],
+    "text:style-name": ["style", "list-style"],
+    "style:parent-style-name": ["style"],
+    "draw:master-page-name": ["master-page"],
+    "draw:fill-gradient-name": ["gradient"],
+    "draw:fill-hatch-name": ["hatch"],
+    "draw:fill-image-name": ["fill-image"],
+    "draw:marker-start": ["marker"],
+    "draw:marker-end": ["marker"],
+    "draw:stroke-dash": ["stroke-dash"]
+}
+
+class PageCache():
+
+    def __init__(self, cache_dir):
+        # Rendered pages of previous runs, stored one file per page fingerprint, so that only
+        #  the pages being reused or written are ever in memory
+        self.cache_dir = cache_dir
+        self.fingerprints = set()
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def fingerprint(pres, page, idx):
+        # Hash of the page XML and, recursively, of every style, master page and image it
+        #  references - anything else the page's rendering depends on (including the fonts
+        #  text is measured with) is in the hash too
+        page_hash = hashlib.sha1()
+        page_hash.update(json.dumps([CACHE_VERSION, idx, pres.view_box, pres.options(), \
+            pres.font_index.index_key()]).encode())
+        visited = set()
+        pending = [page]
+        while pending:
+            elt = pending.pop(0)
+            page_hash.update(etree.tostring(elt.element))
+            for ref_elt in [elt] + elt.find_all():
+                for attr_name, attr_value in ref_elt.attrs.items():
+                    if attr_name == "xlink:href" and pres.archive.has_member(attr_value):
+                        # Assets are named by their content hash (and must exist to be reused)
+                        page_hash.update(pres.assets.asset_url(attr_value).encode())
+                    for kind in REFERENCE_ATTRS.get(attr_name, []):
+                        if (kind, attr_value) not in visited:
+                            visited.add((kind, attr_value))
+                            named_elt = pres.content_registry.find_element(kind, attr_value)
+                            if named_elt is not None:
+                                pending.append(named_elt)
+        return page_hash.hexdigest()
+
+
+    def page_file(self, fingerprint):
+        return os.path.join(self.cache_dir, fingerprint + ".json")
+
+
+    @staticmethod
+    def assets_exist(page_data, data_store):
+        # Image derivatives are named by the size they are displayed at, so aren't in the
+        #  fingerprint - a page is only reused if every file it uses is still in the data store
+        for fragment in page_data["defs"] + [page_data["background"], page_data["layer"]]:
+            for href in HREF_PATTERN.findall(fragment):
+                if href.startswith(data_store) and not os.path.exists(href):
+                    return False
+        return True
+
+
+    def get(self, fingerprint, data_store):
+        try:
+            with open(self.page_file(fingerprint), 'r') as page_in:
+                cache_data = json.load(page_in)
+            if cache_data["version"] == CACHE_VERSION and \
+                PageCache.assets_exist(cache_data["page"], data_store):
+                self.hits += 1
+                self.fingerprints.add(fingerprint)
+                return cache_data["page"]
+        except (OSError, ValueError, KeyError):
+            pass
+        self.misses += 1
+        return None
+
+
+    def put(self, fingerprint, page_data):
+        if fingerprint in self.fingerprints:
+            return
+        self.fingerprints.add(fingerprint)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        page_file = self.page_file(fingerprint)
+        part_file = page_file + "." + str(os.getpid()) + ".part"
+        with open(part_file, 'w') as page_out:
+            json.dump({"version": CACHE_VERSION, "page": page_data}, page_out)
+        os.replace(part_file, page_file)
+
+
+    def prune(self):
+        # Only the pages of this run are kept, so the cache doesn't grow with every edit
+        if not os.path.isdir(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            if os.path.splitext(file_name)[0] not in self.fingerprints:
+                os.remove(os.path.join(self.cache_dir, file_name))
@@ -3,13 +3,60 @@
 
 import re
 import math
+from collections import OrderedDict
+import numpy
 from FillFactory import FillFactory
 from StrokeFactory import StrokeFactory
 from TextBoxParser import TextBoxParser
 from ODPFunctions import units_to_float
+from EquationCompiler import EquationCompiler
+
+MAX_GEOMETRIES = 4096
+
+class PathGeometry():
+
+    def __init__(self, commands, adjs):
+        # Path commands in viewbox units, held as a format template for the whole path and an
+        #  array of the coordinates and lengths it holds, so that a shape is placed with one
+        #  array operation and formatted in one pass
+        template, values, kinds = [], [], []
+        for command, params, param_kinds in commands:
+            parts = [command]
+            for value, kind in zip(params, param_kinds):
+                if kind == "-":
+                    parts.append(str(value))
+                else:
+                    parts.append("{}")
+                    values.append(value)
+                    kinds.append(kind)
+            template.append(" ".join(parts))
+        self.template = " ".join(template)
+        self.on_x_axis = numpy.array([kind in "xw" for kind in kinds], dtype=bool)
+        self.is_coord = numpy.array([kind in "xy" for kind in kinds], dtype=bool)
+        # Mirrored coordinates are reflected in the viewbox
+        values = numpy.array(values, dtype=float)
+        is_mirrored = self.is_coord & numpy.where(self.on_x_axis, adjs[0] > 0, adjs[1] > 0)
+        self.values = numpy.where(is_mirrored, \
+            numpy.where(self.on_x_axis, adjs[0], adjs[1]) - values, values)
+
+
+    def place(self, scales, bases):
+        # Scale to the shape's size and translate coordinates (not lengths) to its position
+        placed = self.values * numpy.where(self.on_x_axis, scales[0], scales[1])
+        numpy.add(placed, numpy.where(self.on_x_axis, bases[0], bases[1]), out=placed, \
+            where=self.is_coord)
+        return self.template.format(*placed.tolist())
+
 
 class ShapeParser():
 
+    # Shape geometries in viewbox units, shared by every shape with the same path and equations,
+    #  least recently used first
+    geometries = OrderedDict()
+    max_geometries = MAX_GEOMETRIES
+    geometry_hits = 0
+    geometry_misses = 0
+
     @classmethod
     def evaluate_equations(cls, geom, vb):
         if "draw:modifiers" in geom.attrs:
@@ -17,49 +64,10 @@ class ShapeParser():
             modifiers = [float(x) for x in modifier_str.split(" ")]
         else:
             modifiers = []
-        # Parse and evaluate equations
-        equations = geom.find_all({"draw:equation"})
-        eq_results = []
-        for equation in equations:
-            raw_formula = equation.attrs["draw:formula"]
-            # Replace $n with modifiers[n], ?fi with eq_results[i]
-            sub_groups = re.split(r'([\$f?]+[0-9]+)', raw_formula)
-            for i in range(len(sub_groups)):
-                if sub_groups[i] and sub_groups[i][0] == "$":
-                    sub_groups[i] = "modifiers[" + sub_groups[i][1:] + "]"
-                elif sub_groups[i] and sub_groups[i][0] == "?":
-                    sub_groups[i] = "eq_results[" + sub_groups[i][2:] + "]"
-            sub_formula = ''.join(sub_groups)
-            # Perform replacements
-            # From https://stackoverflow.com/questions/25631695/replace-all-the-occurrences-of-specific-words
-            replace_dict = {'sin':'math.sin', 'cos':'math.cos', 'tan':'math.tan',
-                            'atan':'math.atan', 'atan2':'math.atan2', 'pi':'math.pi',
-                            'sqrt':'math.sqrt', 'if':'ShapeParser.odp_if',
-                            'top':str(vb[1]), 'bottom':str(vb[3]),
-                            'left':str(vb[0]), 'right':str(vb[2])}
-            sub_formula = re.sub(r'\b(\w+)\b', lambda m: replace_dict.get(m.group(1), m.group(1)), sub_formula)
-            try:
-                eq_results.append(float(eval(sub_formula)))
-            except IndexError:
-                # Formula refers to formula result that has not yet been generated, evaluate later
-                eq_results.append(sub_formula)
-        for i in range(len(eq_results)):
-            eq_results[i] = float(eval(str(eq_results[i])))
-        return modifiers, eq_results
-
-    @staticmethod
-    def odp_if(condition, true_val, false_val):
-        if condition > 0:
-            return true_val
-        else:
-            return false_val
-
-    @staticmethod
-    def tp(z, scale_z, base_z, reflect_z):
-        if reflect_z > 0:
-            return (reflect_z - z) * scale_z + base_z
-        else:
-            return z * scale_z + base_z
+        # Equations are compiled once per shape type, then evaluated in dependency order
+        formulas = [equation.attrs["draw:formula"] for equation in geom.find_all({"draw:equation"})]
+        equation_set = EquationCompiler.compile(geom.get("draw:type"), formulas)
+        return modifiers, equation_set.evaluate(modifiers, vb)
 
     @classmethod
     def transform_shape(cls, shape, shape_path):
@@ -75,46 +83,40 @@ class ShapeParser():
                 print("Unexpected transformation: " + t_params[2*i] + " " + t_params[2*i+1])
 
 
+    # The draw functions add (command, params, kinds) to a list of commands in viewbox units,
+    #  where each character of kinds says how the matching param is placed: x and y are
+    #  coordinates, w and h lengths, and - values (e.g. arc flags) that are used as they are
+
     @classmethod
     # Returns cur_x, cur_y
-    def closepath(cls, section, shape_path, path_start_x, path_start_y):
-        shape_path.push(section)
+    def closepath(cls, section, geometry, path_start_x, path_start_y):
+        geometry.append((section, [], ""))
         # Update path coordinate variables
         return path_start_x, path_start_y
 
 
     @classmethod
     # Returns cur_x, cur_y, path_start_x, path_start_y
-    def draw_linemove(cls, section, shape_path, path_start_x, path_start_y, scales, bases, adjs):
+    def draw_linemove(cls, section, geometry, path_start_x, path_start_y):
         params = [float(x) for x in section[1:].split()]
         cur_x, cur_y = params[-2], params[-1]
-        for i in range(len(params)):
-            if i % 2 == 0:
-                params[i] = ShapeParser.tp(params[i], scales[0], bases[0], adjs[0])
-            else:
-                params[i] = ShapeParser.tp(params[i], scales[1], bases[1], adjs[1])
-        shape_path.push(section[0] + " " + " ".join([str(x) for x in params]))
         if section[0] == "M":
             path_start_x, path_start_y = params[0], params[1]
+        geometry.append((section[0], params, ("xy" * len(params))[:len(params)]))
         return cur_x, cur_y, path_start_x, path_start_y
 
     @classmethod
     # Returns cur_x, cur_y
-    def draw_curve(cls, section, shape_path, scales, bases, adjs):
+    def draw_curve(cls, section, geometry):
         params = [float(x) for x in section[1:].split()]
         cur_x, cur_y = params[-4], params[-3]
-        for i in range(len(params)):
-            if i % 2 == 0:
-                params[i] = ShapeParser.tp(params[i], scales[0], bases[0], adjs[0])
-            else:
-                params[i] = ShapeParser.tp(params[i], scales[1], bases[1], adjs[1])
-        shape_path.push(section[0] + " " + " ".join([str(x) for x in params]))
+        geometry.append((section[0], params, ("xy" * len(params))[:len(params)]))
         return cur_x, cur_y
 
 
     @classmethod
     # Returns cur_x, cur_y, path_start_x, path_start_y
-    def draw_arc(cls, section, shape_path, path_start_x, path_start_y, scales, bases, adjs):
+    def draw_arc(cls, section, geometry, path_start_x, path_start_y):
         # TODO: Deal with multiple sets of params
         print("ABVW")
         params = [float(x) for x in section[1:].split()]
@@ -145,21 +147,17 @@ class ShapeParser():
         elif section[0] == "B":
             start_option, sweep_flag = "M", 0
             path_start_x, path_start_y = start_x, start_y
-        shape_path.push("%s %s %s" % \
-            (start_option, ShapeParser.tp(start_x, scales[0], bases[0], adjs[0]),\
-            ShapeParser.tp(start_y, scales[1], bases[1], adjs[1])))
-        shape_path.push("A %s %s %s %s %s %s %s" %\
-            ((diam_x/2)*scales[0], (diam_y/2)*scales[1],\
-            0, large_angle_flag, sweep_flag,\
-            ShapeParser.tp(end_x, scales[0], bases[0], adjs[0]),\
-            ShapeParser.tp(end_y, scales[1], bases[1], adjs[1])))
+        geometry.append((start_option, \
+            [start_x, start_y], "xy"))
+        geometry.append(("A", [diam_x/2, diam_y/2, 0, large_angle_flag, sweep_flag, \
+            end_x, end_y], "wh---xy"))
         cur_x, cur_y = end_x, end_y
         return cur_x, cur_y, path_start_x, path_start_y
 
 
     @classmethod
     # Returns cur_x, cur_y, path_start_x, path_start_y
-    def draw_ellipse_seg(cls, section, shape_path, path_start_x, path_start_y, scales, bases, adjs):
+    def draw_ellipse_seg(cls, section, geometry, path_start_x, path_start_y):
         # TODO: Deal with multiple sets of params
         print("TU")
         params = [float(x) for x in section[1:].split()]
@@ -182,18 +180,13 @@ class ShapeParser():
             mid_x = c_x + mid_radius * math.cos(math.radians(start_angle+180))
             mid_y = c_y + mid_radius * math.sin(math.radians(start_angle+180))
             if section[0] == "U":
-                shape_path.push("M %s %s" % (\
-                    ShapeParser.tp(start_x, scales[0], bases[0], adjs[0]), \
-                    ShapeParser.tp(start_y, scales[1], bases[1], adjs[1])))
+                geometry.append(("M", \
+                    [start_x, start_y], "xy"))
                 path_start_x, path_start_y = start_x, start_y
-            shape_path.push("A %s %s %s %s %s %s %s" %\
-                (e_width*scales[0], e_height*scales[1], 0, 1, 1,\
-                ShapeParser.tp(mid_x, scales[0], bases[0], adjs[0]),\
-                ShapeParser.tp(mid_y, scales[1], bases[1], adjs[1])))
-            shape_path.push("A %s %s %s %s %s %s %s" %\
-                (e_width*scales[0], e_height*scales[1], 0, 1, 1,\
-                ShapeParser.tp(start_x, scales[0], bases[0], adjs[0]),\
-                ShapeParser.tp(start_y, scales[1], bases[1], adjs[1])))
+            geometry.append(("A", [e_width, e_height, 0, 1, 1, \
+                mid_x, mid_y], "wh---xy"))
+            geometry.append(("A", [e_width, e_height, 0, 1, 1, \
+                start_x, start_y], "wh---xy"))
             cur_x, cur_y = start_x, start_y
         else:
             end_radius = e_width * e_height / math.sqrt(\
@@ -208,21 +201,18 @@ class ShapeParser():
             else:
                 large_angle_flag = 0
             if section[0] == "U":
-                shape_path.push("M %s %s" % (\
-                    ShapeParser.tp(start_x, scales[0], bases[0], adjs[0]),\
-                    ShapeParser.tp(start_y, scales[1], bases[1], adjs[1])))
+                geometry.append(("M", \
+                    [start_x, start_y], "xy"))
                 path_start_x, path_start_y = start_x, start_y
-            shape_path.push("A %s %s %s %s %s %s %s" %\
-                (e_width*scales[0], e_height*scales[1], 0, large_angle_flag, 1,\
-                ShapeParser.tp(end_x, scales[0], bases[0], adjs[0]),\
-                ShapeParser.tp(end_y, scales[1], bases[1], adjs[1])))
+            geometry.append(("A", [e_width, e_height, 0, large_angle_flag, 1, \
+                end_x, end_y], "wh---xy"))
             cur_x, cur_y = end_x, end_y
         return cur_x, cur_y, path_start_x, path_start_y
 
 
     @classmethod
     # Returns cur_x, cur_y
-    def draw_quadrant(cls, section, shape_path, cur_x, cur_y, scales, bases, adjs):
+    def draw_quadrant(cls, section, geometry, cur_x, cur_y):
         # TODO: Deal with multiple param pairs, alternate curve params...
         params = [float(x) for x in section[1:].split()]
         end_x = params[0]
@@ -230,47 +220,15 @@ class ShapeParser():
         e_width = abs(end_x - cur_x)
         e_height = abs(end_y - cur_y)
         sweep_flag = 0
-        shape_path.push("A %s %s %s %s %s %s %s" %\
-            (e_width*scales[0], e_height*scales[1], 0, 0, sweep_flag,\
-            ShapeParser.tp(end_x, scales[0], bases[0], adjs[0]),\
-            ShapeParser.tp(end_y, scales[1], bases[1], adjs[1])))
+        geometry.append(("A", [e_width, e_height, 0, 0, sweep_flag, \
+            end_x, end_y], "wh---xy"))
         cur_x, cur_y = end_x, end_y
         return cur_x, cur_y
 
 
     @classmethod
-    def render_shape(cls, dwg, pres, shape, layer, style_src):
-        # TODO: cope with draw:transform for text boxes
-        geom = shape.find("draw:enhanced-geometry")
-        if "svg:viewbox" in geom.attrs:
-            vb_bounds = [int(x) for x in geom["svg:viewbox"].split()]
-        else:
-            vb_bounds = [0, 0, 21600, 21600]
-        if "svg:x" in shape.attrs:
-            base_x = units_to_float(str(shape["svg:x"]))
-        else:
-            base_x = 0.0
-        if "svg:y" in shape.attrs:
-            base_y = units_to_float(str(shape["svg:y"]))
-        else:
-            base_y = 0.0
-        bases = [base_x, base_y]
-        scale_x = units_to_float(str(shape["svg:width"])) / \
-            (vb_bounds[2] - vb_bounds[0])
-        scale_y = units_to_float(str(shape["svg:height"])) / \
-            (vb_bounds[3] - vb_bounds[1])
-        scales = [scale_x, scale_y]
-        if "draw:mirror-horizontal" in geom.attrs and \
-            geom.attrs["draw:mirror-horizontal"] == "true":
-            x_adj = vb_bounds[2] - vb_bounds[0]
-        else:
-            x_adj = 0
-        if "draw:mirror-vertical" in geom.attrs and geom.attrs["draw:mirror-vertical"] == "true":
-            y_adj = vb_bounds[3] - vb_bounds[1]
-        else:
-            y_adj = 0
-        adjs = [x_adj, y_adj]
-
+    def shape_geometry(cls, geom, vb_bounds, adjs):
+        # Translate the enhanced path from ODP grammar to SVG commands in viewbox units
         # Step 0 - perform substitutions
         modifiers, eq_results = ShapeParser.evaluate_equations(geom, vb_bounds)
 
@@ -278,7 +236,7 @@ class ShapeParser():
         path_sections = re.findall(r'[a-zA-Z][?\$f0-9 -.]*', geom["draw:enhanced-path"])
 
         # Step 2 - translate sections from ODP grammar to SVG equivalent
-        shape_path = dwg.path()
+        geometry = []
 
         path_start_x, path_start_y = 0, 0
         cur_x, cur_y = 0, 0
@@ -288,21 +246,21 @@ class ShapeParser():
             section_groups = section.split(" ")
             for idx, group in enumerate(section_groups):
                 if group and group[0] == "$":
-                    section_groups[idx] = str(eval("modifiers[" + group[1:] + "]"))
+                    section_groups[idx] = str(modifiers[int(group[1:])])
                 elif group and group[0] == "?":
-                    section_groups[idx] = str(eval("eq_results[" + group[2:] + "]"))
+                    section_groups[idx] = str(eq_results[int(group[2:])])
             section = ' '.join(section_groups)
             # print(section)
 
             # Process section
             if section[0] in ["Z"]:
                 cur_x, cur_y = ShapeParser.closepath\
-                    (section, shape_path, path_start_x, path_start_y)
+                    (section, geometry, path_start_x, path_start_y)
             elif section[0] in ["L", "M"]:
                 cur_x, cur_y, path_start_x, path_start_y = ShapeParser.draw_linemove\
-                    (section, shape_path, path_start_x, path_start_y, scales, bases, adjs)
+                    (section, geometry, path_start_x, path_start_y)
             elif section[0] in ["C"]:
-                cur_x, cur_y = ShapeParser.draw_curve(section, shape_path, scales, bases, adjs)
+                cur_x, cur_y = ShapeParser.draw_curve(section, geometry)
             elif section[0] in ["N"]:
                 #  N = endpath
                 print("N not supported")
@@ -315,24 +273,136 @@ class ShapeParser():
                 print("Q not yet supported")
             elif section[0] in ["A", "B", "V", "W"]:
                 cur_x, cur_y, path_start_x, path_start_y = ShapeParser.draw_arc\
-                    (section, shape_path, path_start_x, path_start_y, scales, bases, adjs)
+                    (section, geometry, path_start_x, path_start_y)
             elif section[0] in ["T", "U"]:
                 cur_x, cur_y, path_start_x, path_start_y = ShapeParser.draw_ellipse_seg\
-                    (section, shape_path, path_start_x, path_start_y, scales, bases, adjs)
+                    (section, geometry, path_start_x, path_start_y)
             elif section[0] in ["X", "Y"]:
                 cur_x, cur_y = ShapeParser.draw_quadrant\
-                    (section, shape_path, cur_x, cur_y, scales, bases, adjs)
+                    (section, geometry, cur_x, cur_y)
             else:
                 print("Unrecognised command: " + section)
+        return PathGeometry(geometry, adjs)
+
+
+    @staticmethod
+    def geometry_key(geom, vb_bounds, adjs):
+        # Geometry depends only on the path, equations, modifiers, viewbox and mirroring, so
+        #  repeated shapes only need placing at their own position and size
+        return (geom["draw:enhanced-path"], geom.get("draw:modifiers"), tuple(vb_bounds), \
+            tuple(adjs), tuple(equation.attrs["draw:formula"] \
+            for equation in geom.find_all({"draw:equation"})))
+
+
+    @classmethod
+    def cached_geometry(cls, key, geom, vb_bounds, adjs):
+        if key in cls.geometries:
+            cls.geometry_hits += 1
+            cls.geometries.move_to_end(key)
+            return cls.geometries[key]
+        cls.geometry_misses += 1
+        geometry = ShapeParser.shape_geometry(geom, vb_bounds, adjs)
+        cls.geometries[key] = geometry
+        if len(cls.geometries) > cls.max_geometries:
+            cls.geometries.popitem(last=False)
+        return geometry
+
+
+    @classmethod
+    def geometry_stats(cls):
+        return {"hits": cls.geometry_hits, "misses": cls.geometry_misses, \
+            "geometries": len(cls.geometries)}
+
+
+    @classmethod
+    def share_shapes(cls, pres):
+        # Replace shapes drawn more than once in the current fragment at the same size by <use>
+        #  references to one <symbol>, returning the number of bytes saved. Must be called
+        #  before animations are added to the shapes. Shapes filled or stroked with gradients
+        #  or patterns are left alone, as their paint is positioned in user space, which a
+        #  <use> would move. Shapes of different sizes aren't shared, as scaling a symbol
+        #  would scale its stroke too
+        saved_bytes = 0
+        for (geometry, scales), instances in pres.shape_instances.items():
+            instances = [instance for instance in instances \
+                if "url(" not in str(instance[1].attribs.get("fill", "")) + \
+                str(instance[1].attribs.get("stroke", ""))]
+            if len(instances) < 2:
+                continue
+            local_path = pres.dwg.path()
+            ShapeParser.place_geometry(geometry, local_path, scales, [0, 0])
+            symbol = pres.dwg.symbol(overflow="visible")
+            symbol.add(local_path)
+            shared_symbol = pres.add_def(symbol)
+            if shared_symbol is symbol:
+                # Only a newly added symbol costs bytes - an identical one may already be
+                #  defined, e.g. for an equal geometry under another key
+                saved_bytes -= len(symbol.tostring())
+            symbol = shared_symbol
+            for layer, shape_path, bases in instances:
+                shape_use = pres.dwg.use(symbol, insert=bases)
+                for attr_name, attr_value in shape_path.attribs.items():
+                    if attr_name != "d":
+                        shape_use[attr_name] = attr_value
+                saved_bytes += len(shape_path.tostring()) - len(shape_use.tostring())
+                for idx, layer_elt in enumerate(layer.elements):
+                    if layer_elt is shape_path:
+                        layer.elements[idx] = shape_use
+                for item_data in pres.xml_ids.values():
+                    if item_data["item"] is shape_path:
+                        item_data["item"] = shape_use
+        return saved_bytes
+
+
+    @staticmethod
+    def place_geometry(geometry, shape_path, scales, bases):
+        shape_path.push(geometry.place(scales, bases))
+
+
+    @classmethod
+    def render_shape(cls, dwg, pres, shape, layer, style_src):
+        # TODO: cope with draw:transform for text boxes
+        geom = shape.find("draw:enhanced-geometry")
+        if "svg:viewbox" in geom.attrs:
+            vb_bounds = [int(x) for x in geom["svg:viewbox"].split()]
+        else:
+            vb_bounds = [0, 0, 21600, 21600]
+        if "svg:x" in shape.attrs:
+            base_x = units_to_float(str(shape["svg:x"]))
+        else:
+            base_x = 0.0
+        if "svg:y" in shape.attrs:
+            base_y = units_to_float(str(shape["svg:y"]))
+        else:
+            base_y = 0.0
+        bases = [base_x, base_y]
+        scale_x = units_to_float(str(shape["svg:width"])) / \
+            (vb_bounds[2] - vb_bounds[0])
+        scale_y = units_to_float(str(shape["svg:height"])) / \
+            (vb_bounds[3] - vb_bounds[1])
+        scales = [scale_x, scale_y]
+        if "draw:mirror-horizontal" in geom.attrs and \
+            geom.attrs["draw:mirror-horizontal"] == "true":
+            x_adj = vb_bounds[2] - vb_bounds[0]
+        else:
+            x_adj = 0
+        if "draw:mirror-vertical" in geom.attrs and geom.attrs["draw:mirror-vertical"] == "true":
+            y_adj = vb_bounds[3] - vb_bounds[1]
+        else:
+            y_adj = 0
+        adjs = [x_adj, y_adj]
+
+        shape_path = dwg.path()
+        geometry = ShapeParser.cached_geometry(ShapeParser.geometry_key(geom, vb_bounds, adjs), \
+            geom, vb_bounds, adjs)
+        ShapeParser.place_geometry(geometry, shape_path, scales, bases)
 
         # Apply stroke and fill
         StrokeFactory.stroke(pres, dwg, shape, shape_path, 1, style_src)
-        style_tag = style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": shape["draw:style-name"]})
-        attrs = style_tag.find("style:graphic-properties").attrs
-        FillFactory.fill(dwg, shape_path, pres, attrs, \
+        shape_style = style_src.computed_style(shape["draw:style-name"])
+        FillFactory.fill(dwg, shape_path, pres, shape_style, \
             units_to_float(str(shape["svg:width"])), \
-            units_to_float(str(shape["svg:height"])), style_tag)
+            units_to_float(str(shape["svg:height"])))
 
         # Apply transformation to shape if needed
         if "draw:transform" in shape.attrs:
@@ -350,17 +420,16 @@ class ShapeParser():
             }
             shape_path.__setitem__("id", "obj_"+shape["xml:id"])
 
-        # Add custom shape to main drawing
+        # Add custom shape to main drawing, noting it for share_shapes
         layer.add(shape_path)
+        pres.shape_instances.setdefault((geometry, tuple(scales)), []).append(\
+            (layer, shape_path, bases))
 
         # Overlay any text
         vert_align = "middle"
         if "draw:style-name" in shape.attrs:
-            tb_style_name = shape["draw:style-name"]
-            tb_style = style_src.find("office:automatic-styles")\
-                .find({"style:style"}, {"style:name": tb_style_name})
-            tb_graphics = tb_style.find({"style:graphic-properties"})
-            if "draw:textarea-vertical-align" in tb_graphics.attrs:
+            tb_graphics = style_src.computed_style(shape["draw:style-name"]).graphic
+            if "draw:textarea-vertical-align" in tb_graphics:
                 vert_align = tb_graphics["draw:textarea-vertical-align"]
-        tb_parser = TextBoxParser(dwg, pres, shape, pres.font_mgr, vert_align, style_src)
+        tb_parser = TextBoxParser(dwg, pres, shape, pres.font_cache, vert_align, style_src)
         tb_parser.visit_textbox(layer, "shape")
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=C0103 # Snake-case naming convention
 
-import math
 import re
 from ODPFunctions import units_to_float
 
@@ -11,25 +10,9 @@ class StrokeFactory():
 
     @classmethod
     def stroke(cls, pres, dwg, odp_node, svg_elt, scale_factor, style_src):
-        # Get stroke parameters from the style tree of odp_node, using the first encountered
-        # instance of each parameter (i.e. prefer child style over parent style)
-        style_tag = style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": odp_node["draw:style-name"]})
-        stroke_params = {}
-        continue_descent = True
-        while continue_descent:
-            style_attrs = style_tag.find({"style:graphic-properties"}).attrs
-            for x in ["draw:stroke", "draw:stroke-dash", "svg:stroke-color",\
-                "svg:stroke-width", "svg:stroke-opacity", \
-                "draw:marker-start", "draw:marker-start-width", "draw:marker-start-center",\
-                "draw:marker-end", "draw:marker-end-width", "draw:marker-end-center"]:
-                if x in style_attrs and not x in stroke_params:
-                    stroke_params[x] = style_attrs[x]
-            if "style:parent-style-name" in style_tag.attrs:
-                style_tag = pres.styles.find("office:styles")\
-                    .find({"style:style"}, {"style:name": style_tag["style:parent-style-name"]})
-            else:
-                continue_descent = False
+        # Get stroke parameters from the style tree of odp_node (flattened so that child
+        # style parameters override parent style parameters)
+        stroke_params = style_src.computed_style(odp_node["draw:style-name"]).graphic
         if stroke_params["draw:stroke"] in ["solid", "dash"]:
             stroke_width = units_to_float(str(stroke_params["svg:stroke-width"]))
             if stroke_width == 0.0:
@@ -43,8 +26,7 @@ class StrokeFactory():
         else:
             svg_elt.stroke(width=0)
         if stroke_params["draw:stroke"] == "dash":
-            dash_node = pres.styles.find("office:styles")\
-                .find({"draw:stroke-dash"}, {"draw:name": stroke_params["draw:stroke-dash"]})
+            dash_node = pres.styles_registry.stroke_dash(stroke_params["draw:stroke-dash"])
             dash_array = []
             gap_length = dash_node["draw:distance"]
             if gap_length[-1] == "%":
@@ -79,15 +61,12 @@ class StrokeFactory():
 
         # Add start and end markers to lines
         if odp_node.name in ["draw:line"]:
-            line_angle = math.degrees(math.atan2(\
-                units_to_float(odp_node.attrs["svg:y2"]) - \
-                units_to_float(odp_node.attrs["svg:y1"]),\
-                units_to_float(odp_node.attrs["svg:x2"]) - \
-                units_to_float(odp_node.attrs["svg:x1"])))
+            # Markers are oriented along the line, with the head turned -90 (start) or +90 (end)
+            #  degrees about its reference point, so lines at any angle share the same marker.
+            #  The turned head may extend outside the marker's viewport
             markers = [None, None, None]
             if "draw:marker-start" in stroke_params:
-                s_marker_style = pres.styles.find("office:styles")\
-                    .find({"draw:marker"}, {"draw:name": stroke_params["draw:marker-start"]})
+                s_marker_style = pres.styles_registry.marker(stroke_params["draw:marker-start"])
                 s_marker_vb = s_marker_style["svg:viewbox"].split()
                 s_marker_w = units_to_float(stroke_params["draw:marker-start-width"])
                 s_marker_vb_w = int(s_marker_vb[2]) - int(s_marker_vb[0])
@@ -100,15 +79,14 @@ class StrokeFactory():
                 s_marker = dwg.marker(insert=(0.5 * s_marker_vb_w, s_ref_y * s_marker_vb_h),\
                     size=(s_marker_w, s_marker_w * s_marker_vb_h / s_marker_vb_w), \
                     viewBox=(' '.join(s_marker_vb)), markerUnits="userSpaceOnUse",\
-                    fill=stroke_params["svg:stroke-color"], orient=line_angle-90)
-                s_marker_path = dwg.path(d=s_marker_d)
+                    fill=stroke_params["svg:stroke-color"], orient="auto", overflow="visible")
+                s_marker_path = dwg.path(d=s_marker_d, transform="rotate(-90 " + \
+                    str(0.5 * s_marker_vb_w) + " " + str(s_ref_y * s_marker_vb_h) + ")")
                 s_marker.add(s_marker_path)
-                dwg.defs.add(s_marker)
-                markers[0] = s_marker
+                markers[0] = pres.add_def(s_marker)
 
             if "draw:marker-end" in stroke_params:
-                e_marker_style = pres.styles.find("office:styles")\
-                    .find({"draw:marker"}, {"draw:name": stroke_params["draw:marker-end"]})
+                e_marker_style = pres.styles_registry.marker(stroke_params["draw:marker-end"])
                 e_marker_vb = e_marker_style["svg:viewbox"].split()
                 e_marker_w = units_to_float(stroke_params["draw:marker-end-width"])
                 e_marker_vb_w = int(e_marker_vb[2]) - int(e_marker_vb[0])
@@ -121,9 +99,9 @@ class StrokeFactory():
                 e_marker = dwg.marker(insert=(0.5 * e_marker_vb_w, e_ref_y * e_marker_vb_h),\
                     size=(e_marker_w, e_marker_w * e_marker_vb_h / e_marker_vb_w), \
                     viewBox=(' '.join(e_marker_vb)), markerUnits="userSpaceOnUse",\
-                    fill=stroke_params["svg:stroke-color"], orient=line_angle+90)
-                e_marker_path = dwg.path(d=e_marker_d)
+                    fill=stroke_params["svg:stroke-color"], orient="auto", overflow="visible")
+                e_marker_path = dwg.path(d=e_marker_d, transform="rotate(90 " + \
+                    str(0.5 * e_marker_vb_w) + " " + str(e_ref_y * e_marker_vb_h) + ")")
                 e_marker.add(e_marker_path)
-                dwg.defs.add(e_marker)
-                markers[2] = e_marker
+                markers[2] = pres.add_def(e_marker)
             svg_elt.set_markers(tuple(markers))
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+from collections import namedtuple
+from types import MappingProxyType
+
+# Style elements that are indexed by name, as (section of the document containing them,
+#  element names, attribute holding the element name)
+INDEXED_ELEMENTS = {
+    "automatic": ("office:automatic-styles", ["style:style"], "style:name"),
+    "common": ("office:styles", ["style:style"], "style:name"),
+    "gradient": (None, ["draw:gradient"], "draw:name"),
+    "hatch": (None, ["draw:hatch"], "draw:name"),
+    "fill-image": (None, ["draw:fill-image"], "draw:name"),
+    "marker": (None, ["draw:marker"], "draw:name"),
+    "stroke-dash": (None, ["draw:stroke-dash"], "draw:name"),
+    "list-style": ("office:automatic-styles", ["text:list-style"], "style:name"),
+    "page-layout": ("office:automatic-styles", ["style:page-layout"], "style:name"),
+    "master-page": ("office:master-styles", ["style:master-page"], "style:name")
+}
+
+# Property groups that are flattened down the style:parent-style-name chain
+PROPERTY_GROUPS = {
+    "graphic": "style:graphic-properties",
+    "text": "style:text-properties",
+    "paragraph": "style:paragraph-properties",
+    "drawing_page": "style:drawing-page-properties"
+}
+
+# Resolved style - each property group is a read-only mapping of attribute to value
+ComputedStyle = namedtuple("ComputedStyle", ["name", "family"] + list(PROPERTY_GROUPS))
+
+EMPTY_PROPS = MappingProxyType({})
+
+class StyleRegistry():
+
+    def __init__(self, soup, parent=None):
+        # parent is the registry of styles.xml, used to resolve styles not defined in this
+        #  document (e.g. office:styles parents of content.xml automatic styles)
+        self.parent = parent
+        self.computed = {}
+        # Walk the document once, building a name -> tag dictionary for each kind of
+        #  style element so that renderers don't need to search the soup for each shape
+        self.index = {}
+        for kind, (section, tags, name_attr) in INDEXED_ELEMENTS.items():
+            self.index[kind] = {}
+            if section:
+                section_tag = soup.find(section)
+            else:
+                section_tag = soup
+            if not section_tag:
+                continue
+            for tag in section_tag.find_all(tags):
+                if name_attr in tag.attrs and tag[name_attr] not in self.index[kind]:
+                    self.index[kind][tag[name_attr]] = tag
+
+
+    def lookup(self, kind, name):
+        return self.index[kind].get(name)
+
+
+    def style(self, name):
+        # Automatic styles take precedence over common styles of the same name
+        style_tag = self.automatic_style(name)
+        if style_tag is None:
+            style_tag = self.common_style(name)
+        return style_tag
+
+
+    def find_element(self, kind, name):
+        # Named element of any kind ("style" for automatic or common styles), falling back
+        #  to the parent registry
+        if kind == "style":
+            elt = self.style(name)
+        else:
+            elt = self.lookup(kind, name)
+        if elt is None and self.parent:
+            return self.parent.find_element(kind, name)
+        return elt
+
+
+    def computed_style(self, name):
+        # Each named style is flattened with its parent chain once per document
+        if name not in self.computed:
+            self.computed[name] = self.compute_style(name)
+        return self.computed[name]
+
+
+    def compute_style(self, name):
+        style_tag = self.style(name)
+        if style_tag is None:
+            if self.parent:
+                return self.parent.computed_style(name)
+            return None
+        if "style:parent-style-name" in style_tag.attrs:
+            parent_style = self.computed_style(style_tag["style:parent-style-name"])
+        else:
+            parent_style = None
+        groups = {}
+        for group, tag_name in PROPERTY_GROUPS.items():
+            if parent_style:
+                props = dict(getattr(parent_style, group))
+            else:
+                props = {}
+            props_tag = style_tag.find({tag_name}, recursive=False)
+            if props_tag:
+                props.update(props_tag.attrs)
+            groups[group] = MappingProxyType(props) if props else EMPTY_PROPS
+        return ComputedStyle(name=name, family=style_tag.get("style:family"), **groups)
+
+
+    def automatic_style(self, name):
+        return self.index["automatic"].get(name)
+
+
+    def common_style(self, name):
+        return self.index["common"].get(name)
+
+
+    def gradient(self, name):
+        return self.index["gradient"].get(name)
+
+
+    def hatch(self, name):
+        return self.index["hatch"].get(name)
+
+
+    def fill_image(self, name):
+        return self.index["fill-image"].get(name)
+
+
+    def marker(self, name):
+        return self.index["marker"].get(name)
+
+
+    def stroke_dash(self, name):
+        return self.index["stroke-dash"].get(name)
+
+
+    def list_style(self, name):
+        return self.index["list-style"].get(name)
+
+
+    def page_layout(self, name):
+        return self.index["page-layout"].get(name)
+
+
+    def master_page(self, name):
+        return self.index["master-page"].get(name)
+
+
+    def first_master_page(self):
+        return next(iter(self.index["master-page"].values()), None)
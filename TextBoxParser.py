@@ -4,8 +4,6 @@
 import math
 import re
 from copy import deepcopy
-from matplotlib.font_manager import FontProperties
-from PIL import ImageFont
 from ODPFunctions import units_to_float, int_to_format
 
 DPCM = 37.7953
@@ -25,11 +23,11 @@ DASH_ARRAYS = {"dash": [0.4, 0.15], "dot-dash": [0.1, 0.1, 0.4, 0.1], \
 
 class TextBoxParser():
 
-    def __init__(self, dwg, pres, item, font_mgr, v_align, style_src):
+    def __init__(self, dwg, pres, item, font_cache, v_align, style_src):
         self.dwg = dwg
         self.pres = pres
         self.item = item
-        self.font_mgr = font_mgr
+        self.font_cache = font_cache
         self.v_align = v_align
         self.style_src = style_src
         self.svg_x = 0
@@ -45,49 +43,37 @@ class TextBoxParser():
 
 
     def populate_stack_frame(self, frame, style_name):
-        style_tag = self.style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": style_name})
-        style_text_props = style_tag.find({"style:text-properties"}, recursive=False)
-        if style_text_props:
-            for prop in TEXT_PROPS:
-                if prop in style_text_props.attrs:
-                    frame[prop] = style_text_props[prop]
-        style_para_props = style_tag.find({"style:paragraph-properties"}, recursive=False)
-        if style_para_props:
-            for prop in PARA_PROPS:
-                if prop in style_para_props.attrs:
-                    frame[prop] = style_para_props[prop]
-            for prop in PARA_PROPS_U:
-                if prop in style_para_props.attrs:
-                    frame[prop] = units_to_float(style_para_props[prop])
+        style = self.style_src.computed_style(style_name)
+        for prop in TEXT_PROPS:
+            if prop in style.text:
+                frame[prop] = style.text[prop]
+        for prop in PARA_PROPS:
+            if prop in style.paragraph:
+                frame[prop] = style.paragraph[prop]
+        for prop in PARA_PROPS_U:
+            if prop in style.paragraph:
+                frame[prop] = units_to_float(style.paragraph[prop])
 
 
     def populate_root_frame(self, frame, pres_style, draw_style):
-        frame_style = self.style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": pres_style})
-        parent_frame_style = self.pres.styles.find("office:styles")\
-            .find({"style:style"}, {"style:name": frame_style["style:parent-style-name"]})
-        parent_text_props = parent_frame_style.find({"style:text-properties"}, recursive=False)
-        parent_para_props = parent_frame_style.find({"style:paragraph-properties"}, recursive=False)
-        frame_text_style = self.style_src.find("office:automatic-styles")\
-            .find({"style:style"}, {"style:name": draw_style})
-        frame_text_props = frame_text_style.find({"style:text-properties"}, recursive=False)
-        frame_para_props = frame_text_style.find({"style:paragraph-properties"}, recursive=False)
+        # Text style properties override those of the (flattened) frame style
+        frame_style = self.style_src.computed_style(pres_style)
+        text_style = self.style_src.computed_style(draw_style)
         for prop in TEXT_PROPS:
-            if frame_text_props and prop in frame_text_props.attrs:
-                frame[prop] = frame_text_props[prop]
-            elif parent_text_props and prop in parent_text_props.attrs:
-                frame[prop] = parent_text_props[prop]
+            if prop in text_style.text:
+                frame[prop] = text_style.text[prop]
+            elif prop in frame_style.text:
+                frame[prop] = frame_style.text[prop]
         for prop in PARA_PROPS:
-            if frame_para_props and prop in frame_para_props.attrs:
-                frame[prop] = frame_para_props[prop]
-            elif parent_para_props and prop in parent_para_props.attrs:
-                frame[prop] = parent_para_props[prop]
+            if prop in text_style.paragraph:
+                frame[prop] = text_style.paragraph[prop]
+            elif prop in frame_style.paragraph:
+                frame[prop] = frame_style.paragraph[prop]
         for prop in PARA_PROPS_U:
-            if frame_para_props and prop in frame_para_props.attrs:
-                frame[prop] = units_to_float(frame_para_props[prop])
-            elif parent_para_props and prop in parent_para_props.attrs:
-                frame[prop] = units_to_float(parent_para_props[prop])
+            if prop in text_style.paragraph:
+                frame[prop] = units_to_float(text_style.paragraph[prop])
+            elif prop in frame_style.paragraph:
+                frame[prop] = units_to_float(frame_style.paragraph[prop])
 
 
     @staticmethod
@@ -158,25 +144,23 @@ class TextBoxParser():
             prev_type = "space"
             for span in queue_copy:
                 span_parts = re.split(r'([ ]+)', span["text"])
-                span_font = self.font_mgr.findfont(FontProperties(\
-                    family=span["stack-frame"]["style:font-name"], \
-                    style=span["stack-frame"]["fo:font-style"], \
-                    weight=span["stack-frame"]["fo:font-weight"]))
-                i_font = ImageFont.truetype(span_font, math.ceil(float(span["font-size"])*96/72))
-                for part in span_parts:
+                i_font = self.font_cache.font(span["stack-frame"]["style:font-name"], \
+                    span["stack-frame"]["fo:font-style"], span["stack-frame"]["fo:font-weight"], \
+                    math.ceil(float(span["font-size"])*96/72))
+                part_widths = self.font_cache.text_widths(i_font, span_parts)
+                for part, part_width in zip(span_parts, part_widths):
                     # Get width of part
                     if part != "":
-                        size = i_font.getsize(part)
                         # If word then add to queue and add current value of total width to span_x
                         if part.strip() != "":
                             if prev_type == "word":
                                 # Add zero size space
                                 space_lens.append(0)
                             queue.append({"text": part, "style": span["style"], \
-                                "stack-frame": span["stack-frame"].copy(), "width": size[0], \
+                                "stack-frame": span["stack-frame"].copy(), "width": part_width, \
                                 "height": span["height"], "font-size": span["font-size"]})
-                            word_lens.append(size[0])
-                            total_words += size[0]
+                            word_lens.append(part_width)
+                            total_words += part_width
                             prev_type = "word"
                         else:
                             if prev_type == "space":
@@ -184,8 +168,8 @@ class TextBoxParser():
                                 queue.append({"text": "\xa0", "style": span["style"], \
                                     "stack-frame": span["stack-frame"].copy(), "width": 0, \
                                     "height": span["height"], "font-size": span["font-size"]})
-                            space_lens.append(size[0])
-                            total_spaces += size[0]
+                            space_lens.append(part_width)
+                            total_spaces += part_width
                             prev_type = "space"
             # Divide available space among spaces
             if t_align == "justify" and total_spaces > 0:
@@ -374,11 +358,6 @@ class TextBoxParser():
                 self.populate_stack_frame(span_stack_frame, item_span["text:style-name"])
             self.style_stack.append(span_stack_frame)
 
-            span_font = self.font_mgr.findfont(FontProperties(\
-                family=span_stack_frame["style:font-name"],
-                style=span_stack_frame["fo:font-style"],
-                weight=span_stack_frame["fo:font-weight"]))
-
             # Text position is either "normal" or a baseline adjustment e.g. "33%" or
             # a baseline adjustment and font size adjustment e.g. "-33% 58%"
             # Font size only changes in the final of the three cases
@@ -390,7 +369,9 @@ class TextBoxParser():
 
             scaled_font_size = str(base_font_size/DPCM)
 
-            i_font = ImageFont.truetype(span_font, math.ceil(base_font_size*96/72))
+            i_font = self.font_cache.font(span_stack_frame["style:font-name"], \
+                span_stack_frame["fo:font-style"], span_stack_frame["fo:font-weight"], \
+                math.ceil(base_font_size*96/72))
             i_font_height = i_font.font.ascent + i_font.font.descent
 
             # Replace all <text:s></text:s> tags with spaces
@@ -425,7 +406,7 @@ class TextBoxParser():
                 if span_text == "":
                     span_w = 0
                 else:
-                    span_w = i_font.getsize(span_text)[0]
+                    span_w = self.font_cache.text_width(i_font, span_text)
                 queued_spans.append({\
                     "style": self.output_tspan_style(span_stack_frame, scaled_font_size),
                     "height": i_font_height/DPCM,
@@ -449,15 +430,16 @@ class TextBoxParser():
                 # Find next word break
                 next_pos = span_text.find(" ", span_pos+1)
                 if next_pos != -1 and span_text[span_start:next_pos].strip() != "":
-                    size = i_font.getsize(span_text[span_start:next_pos])
-                    if size[0] + line_size > line_width:
+                    run_width = self.font_cache.run_width(i_font, span_text[span_start:next_pos])
+                    if run_width + line_size > line_width:
                         # Write out span up to span_pos then start new span on next line
                         queued_spans.append({\
                             "style": self.output_tspan_style(span_stack_frame, scaled_font_size),
                             "height": i_font_height/DPCM,
                             "descent": i_font.font.descent/DPCM,
                             "ascent": i_font.font.ascent/DPCM,
-                            "width": i_font.getsize(span_text[span_start:span_pos].rstrip())[0],
+                            "width": self.font_cache.run_width(i_font, \
+                                span_text[span_start:span_pos].rstrip()),
                             "font-size": base_font_size,
                             "text": span_text[span_start:span_pos].rstrip(),
                             "stack-frame": span_stack_frame.copy()})
@@ -474,8 +456,8 @@ class TextBoxParser():
                             first_descent = line_d
                 elif next_pos == -1 and span_text[span_start:].strip() != "":
                     # End of span_text has been reached
-                    size = i_font.getsize(span_text[span_start:])
-                    if size[0] + line_size > line_width:
+                    run_width = self.font_cache.run_width(i_font, span_text[span_start:])
+                    if run_width + line_size > line_width:
                         # Write out span up to span_pos then start new span on next line
                         if span_text[span_start:span_pos] != "":
                             queued_spans.append({\
@@ -484,8 +466,8 @@ class TextBoxParser():
                                 "height": i_font_height/DPCM,
                                 "descent": i_font.font.descent/DPCM,
                                 "ascent": i_font.font.ascent/DPCM,
-                                "width": i_font.getsize(span_text[span_start:span_pos]\
-                                    .rstrip())[0],
+                                "width": self.font_cache.run_width(i_font, \
+                                    span_text[span_start:span_pos].rstrip()),
                                 "font-size": base_font_size,
                                 "text": span_text[span_start:span_pos].rstrip(),
                                 "stack-frame": span_stack_frame.copy()})
@@ -499,11 +481,11 @@ class TextBoxParser():
                             "height": i_font_height/DPCM,
                             "descent": i_font.font.descent/DPCM,
                             "ascent": i_font.font.ascent/DPCM,
-                            "width": i_font.getsize(span_text[span_pos:])[0],
+                            "width": self.font_cache.run_width(i_font, span_text[span_pos:]),
                             "font-size": base_font_size,
                             "text": span_text[span_pos:],
                             "stack-frame": span_stack_frame.copy()})
-                        line_size = i_font.getsize(span_text[span_pos:])[0]
+                        line_size = self.font_cache.run_width(i_font, span_text[span_pos:])
                         span_start = span_pos
                         p_height += line_h
                         if on_first_line:
@@ -517,11 +499,11 @@ class TextBoxParser():
                             "height": i_font_height/DPCM,
                             "descent": i_font.font.descent/DPCM,
                             "ascent": i_font.font.ascent/DPCM,
-                            "width": i_font.getsize(span_text[span_start:])[0],
+                            "width": self.font_cache.run_width(i_font, span_text[span_start:]),
                             "font-size": base_font_size,
                             "text": span_text[span_start:],
                             "stack-frame": span_stack_frame.copy()})
-                        line_size += size[0]
+                        line_size += run_width
                 span_pos = next_pos
                 # Process highlights and decor_lines
                 for hl in h_lights:
@@ -573,8 +555,7 @@ class TextBoxParser():
             list_style = item_l["text:style-name"]
         else:
             list_style = parent_style
-        l_styles = self.style_src.find("office:automatic-styles")\
-            .find({"text:list-style"}, {"style:name": list_style}).findChildren(recursive=False)
+        l_styles = self.style_src.list_style(list_style).findChildren(recursive=False)
 
         l_height = 0
         first_span = None
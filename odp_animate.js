@@ -1,31 +1,93 @@
 var json_data;
 var page_anims;
 var cur_page_idx;
+// Page most recently navigated to, which may still be being fetched
+var requested_page_idx;
 var next_anim_idx;
+// Number of pages after the current one that are fetched in advance
+var prefetch_pages = 2;
+// Promises of the SVG files fetched so far (for output with each page in its own file)
+var svg_requests = {};
 
-function load_page(idx){
-    if (0 <= idx && idx < json_data["pages"].length){
-        cur_page_idx = idx;
-        page_g_id = json_data["pages"][idx]["page_id"];
-        // Hide all SVG top level groups apart from this page and its background
-        $('svg > g[id^=page]').css('display', 'none');
-        $('#' + page_g_id).css('display','block');
-        $('#' + page_g_id + '_bg').css('display','block');
-        hidden_ids = json_data["pages"][idx]["init_hidden"];
-        visible_ids = json_data["pages"][idx]["init_visible"];
-        // Show animated elements that are initially visible
-        for(var i=0; i < visible_ids.length; i++){
-            set_visibility(visible_ids[i], "visible");
+function inject_svg(svg_text){
+    // Move the defs, page backgrounds and page layers of a page (or defs) file into the
+    // presentation's SVG
+    var svg_doc = new DOMParser().parseFromString(svg_text, "image/svg+xml");
+    var svg_root = document.querySelector('svg');
+    var page_bgs = document.getElementById('ind_page_bgs');
+    $(svg_doc.documentElement).children().each(function(){
+        if (this.tagName == 'defs'){
+            $(this).children().each(function(){
+                svg_root.querySelector('defs').appendChild(document.importNode(this, true));
+            });
+        } else if (this.id == 'ind_page_bgs'){
+            $(this).children().each(function(){
+                page_bgs.appendChild(document.importNode(this, true));
+            });
+        } else {
+            svg_root.appendChild(document.importNode(this, true));
         }
-        // Hide animated elements that are initially hidden
-        for(var j=0; j < hidden_ids.length; j++){
-            set_visibility(hidden_ids[j], "hidden");
+    });
+}
+
+function fetch_svg(svg_file){
+    if (!(svg_file in svg_requests)){
+        svg_requests[svg_file] = $.get(svg_file, null, null, "text").then(inject_svg);
+    }
+    return svg_requests[svg_file];
+}
+
+function fetch_page(idx){
+    // Resolves once the page is in the document - straight away if it was output inline
+    var page_file = json_data["pages"][idx]["page_file"];
+    if (page_file === undefined){
+        return $.Deferred().resolve().promise();
+    }
+    return fetch_svg(json_data["defs_file"]).then(function(){
+        return fetch_svg(page_file);
+    });
+}
+
+function load_page(idx, on_loaded){
+    if (0 <= idx && idx < json_data["pages"].length){
+        requested_page_idx = idx;
+        fetch_page(idx).then(function(){
+            if (idx != requested_page_idx){
+                // The user has moved on to another page while this one was fetched
+                return;
+            }
+            show_page(idx);
+            if (on_loaded){
+                on_loaded();
+            }
+        });
+        for (var i=idx+1; i <= idx+prefetch_pages && i < json_data["pages"].length; i++){
+            fetch_page(i);
         }
-        page_anims = json_data["pages"][idx]["animations"];
-        next_anim_idx = 0;
     }
 }
 
+function show_page(idx){
+    cur_page_idx = idx;
+    page_g_id = json_data["pages"][idx]["page_id"];
+    // Hide all SVG top level groups apart from this page and its background
+    $('svg > g[id^=page]').css('display', 'none');
+    $('#' + page_g_id).css('display','block');
+    $('#' + page_g_id + '_bg').css('display','block');
+    hidden_ids = json_data["pages"][idx]["init_hidden"];
+    visible_ids = json_data["pages"][idx]["init_visible"];
+    // Show animated elements that are initially visible
+    for(var i=0; i < visible_ids.length; i++){
+        set_visibility(visible_ids[i], "visible");
+    }
+    // Hide animated elements that are initially hidden
+    for(var j=0; j < hidden_ids.length; j++){
+        set_visibility(hidden_ids[j], "hidden");
+    }
+    page_anims = json_data["pages"][idx]["animations"];
+    next_anim_idx = 0;
+}
+
 function next_animation(){
     if (next_anim_idx < page_anims.length){
         anim_id = page_anims[next_anim_idx]["id"];
@@ -58,9 +120,10 @@ function prev_animation(){
         }
         next_anim_idx--;
     } else if (cur_page_idx > 0){
-        load_page(cur_page_idx - 1);
-        next_anim_idx = page_anims.length;
-        setTimeout(prev_slide_load_end, 1);
+        load_page(cur_page_idx - 1, function(){
+            next_anim_idx = page_anims.length;
+            setTimeout(prev_slide_load_end, 1);
+        });
     }
 }
 
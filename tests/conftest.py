@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import os
+import sys
+
+# The converter's modules sit at the top of the repository rather than in a package, so make
+#  them (and the deck builder next to this file) importable however pytest is run
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in [os.path.dirname(TESTS_DIR), TESTS_DIR]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
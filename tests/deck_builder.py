@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import io
+import struct
+import zipfile
+from PIL import Image
+
+# Builds small .odp files for the tests - a 28cm x 15.75cm page layout, a "Default" master page
+#  and a "standard" graphic style, plus whatever pages, styles and pictures a test needs
+
+NAMESPACES = \
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" ' \
+    'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" ' \
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" ' \
+    'xmlns:draw="urn:oasis:names:tc:opendocument:xmlns:drawing:1.0" ' \
+    'xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0" ' \
+    'xmlns:xlink="http://www.w3.org/1999/xlink" ' \
+    'xmlns:svg="urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0" ' \
+    'xmlns:presentation="urn:oasis:names:tc:opendocument:xmlns:presentation:1.0" ' \
+    'xmlns:smil="urn:oasis:names:tc:opendocument:xmlns:smil-compatible:1.0" ' \
+    'xmlns:anim="urn:oasis:names:tc:opendocument:xmlns:animation:1.0"'
+
+STYLES_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<office:document-styles {namespaces}>
+<office:styles>
+{styles}
+<style:style style:name="standard" style:family="graphic">
+<style:graphic-properties draw:stroke="solid" svg:stroke-width="0.05cm" svg:stroke-color="#3465a4" \
+draw:fill="solid" draw:fill-color="#729fcf"/>
+</style:style>
+</office:styles>
+<office:automatic-styles>
+<style:page-layout style:name="PM1">
+<style:page-layout-properties fo:page-width="28cm" fo:page-height="15.75cm"/>
+</style:page-layout>
+<style:style style:name="dp1" style:family="drawing-page">
+<style:drawing-page-properties draw:fill="solid" draw:fill-color="#ffffff"/>
+</style:style>
+</office:automatic-styles>
+<office:master-styles>
+<style:master-page style:name="Default" style:page-layout-name="PM1" draw:style-name="dp1">
+{master_items}
+</style:master-page>
+</office:master-styles>
+</office:document-styles>'''
+
+CONTENT_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content {namespaces}>
+<office:automatic-styles>
+<style:style style:name="dp2" style:family="drawing-page">
+<style:drawing-page-properties presentation:background-visible="true"/>
+</style:style>
+{automatic_styles}
+</office:automatic-styles>
+<office:body><office:presentation>
+{pages}
+</office:presentation></office:body>
+</office:document-content>'''
+
+def picture(size, color, img_format="PNG", **save_args):
+    img_data = io.BytesIO()
+    Image.new("RGB", size, color).save(img_data, img_format, **save_args)
+    return img_data.getvalue()
+
+def metafile(size_inches):
+    # Placeable Windows metafile header (which PIL can read, but not draw) for an image
+    #  size_inches across at 1440 units per inch, followed by an empty metafile
+    width, height = (round(length * 1440) for length in size_inches)
+    header = struct.pack("<IHhhhhHI", 0x9ac6cdd7, 0, 0, 0, width, height, 1440, 0)
+    checksum = 0
+    for word in struct.unpack("<10H", header):
+        checksum ^= word
+    return header + struct.pack("<H", checksum) + \
+        struct.pack("<HHHIHIH", 1, 9, 0x300, 12, 0, 3, 0) + struct.pack("<IH", 3, 0)
+
+MANIFEST_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">
+{entries}
+</manifest:manifest>'''
+
+def build_deck(deck_path, page_items, automatic_styles="", styles="", master_items="", \
+    pictures=None, media_types=None):
+    # page_items is a list of the XML of each page's items, pictures a dictionary of archive
+    #  member name (e.g. Pictures/photo.png) -> image data, and media_types (if given) one of
+    #  member name -> media type for the manifest
+    pages = "".join('<draw:page draw:name="page' + str(idx + 1) + '" ' \
+        'draw:style-name="dp2" draw:master-page-name="Default">' + items + '</draw:page>' \
+        for idx, items in enumerate(page_items))
+    with zipfile.ZipFile(deck_path, "w") as deck_zip:
+        deck_zip.writestr("mimetype", "application/vnd.oasis.opendocument.presentation")
+        deck_zip.writestr("styles.xml", STYLES_XML.format(namespaces=NAMESPACES, \
+            styles=styles, master_items=master_items))
+        deck_zip.writestr("content.xml", CONTENT_XML.format(namespaces=NAMESPACES, \
+            automatic_styles=automatic_styles, pages=pages))
+        for member_name, member_data in (pictures or {}).items():
+            deck_zip.writestr(member_name, member_data)
+        if media_types is not None:
+            deck_zip.writestr("META-INF/manifest.xml", MANIFEST_XML.format(entries="".join( \
+                '<manifest:file-entry manifest:full-path="' + member_name + \
+                '" manifest:media-type="' + media_type + '"/>' \
+                for member_name, media_type in media_types.items())))
+    return deck_path
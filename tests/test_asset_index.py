@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from deck_builder import build_deck, metafile, picture
+from ODPPresentation import ODPPresentation
+
+FRAME = '<draw:frame draw:style-name="standard" svg:width="8cm" svg:height="6cm" svg:x="1cm" ' \
+    'svg:y="1cm"><draw:image xlink:href="Pictures/{0}"/></draw:frame>'
+# Unsized tiled bitmap fills are sized from the image's header
+BITMAP_STYLE = '<style:style style:name="gr1" style:family="graphic" ' \
+    'style:parent-style-name="standard"><style:graphic-properties draw:fill="bitmap" ' \
+    'draw:fill-image-name="B1" style:repeat="repeat" draw:fill-image-width="0cm" ' \
+    'draw:fill-image-height="0cm" draw:fill-image-ref-point="top-left" ' \
+    'draw:fill-image-ref-point-x="0%" draw:fill-image-ref-point-y="0%" ' \
+    'draw:tile-repeat-offset="0% horizontal"/></style:style>'
+FILL_IMAGE = '<draw:fill-image draw:name="B1" xlink:href="Pictures/tile.png"/>'
+CLIPPED_FRAME = '<draw:frame draw:style-name="clipped" svg:width="8cm" svg:height="6cm" ' \
+    'svg:x="1cm" svg:y="1cm"><draw:image xlink:href="Pictures/{0}"/></draw:frame>'
+CLIP_STYLE = '<style:style style:name="clipped" style:family="graphic" ' \
+    'style:parent-style-name="standard"><style:graphic-properties ' \
+    'fo:clip="rect(0.1cm, 0.1cm, 0.1cm, 0.1cm)"/></style:style>'
+
+class AssetIndexTest(unittest.TestCase):
+
+    def convert(self, deck, data_store, workers):
+        out_dir = os.path.dirname(deck)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ODPPresentation(deck, data_store) as pres:
+                pres.parse(os.path.join(out_dir, "out.html"), os.path.join(out_dir, "out.json"), \
+                    workers=workers)
+
+
+    def test_pool_pages_are_indexed(self):
+        # Image information found while rendering pages in worker processes is returned to the
+        #  presentation and saved in the data store's index
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck = build_deck(os.path.join(tmp_dir, "deck.odp"), \
+                [CLIPPED_FRAME.format("photo1.png"), CLIPPED_FRAME.format("photo2.png"), \
+                '<draw:polygon draw:style-name="gr1" svg:width="4cm" svg:height="3cm" ' \
+                'svg:x="1cm" svg:y="1cm" svg:viewBox="0 0 4000 3000" ' \
+                'draw:points="0,0 4000,0 4000,3000"/>'], \
+                automatic_styles=BITMAP_STYLE + CLIP_STYLE, styles=FILL_IMAGE, \
+                master_items=FRAME.format("logo.png"), \
+                pictures={"Pictures/photo1.png": picture((120, 90), "red"), \
+                "Pictures/photo2.png": picture((200, 100), "blue"), \
+                "Pictures/tile.png": picture((32, 32), "green"), \
+                "Pictures/logo.png": picture((10, 10), "black")})
+            data_store = os.path.join(tmp_dir, "store", "")
+            self.convert(deck, data_store, 2)
+            with open(data_store + "asset_index.json") as index_file:
+                asset_index = json.load(index_file)
+            image_sizes = sorted(tuple(entry["image"][:2]) for entry in asset_index.values() \
+                if entry.get("image"))
+            self.assertEqual(image_sizes, [(32, 32), (120, 90), (200, 100)])
+            self.assertEqual(len(asset_index), 4)
+
+
+    def test_clipped_metafile(self):
+        # PIL reports a metafile's resolution as one number, rather than an (x, y) pair
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck = build_deck(os.path.join(tmp_dir, "deck.odp"), \
+                [CLIPPED_FRAME.format("chart.wmf")], automatic_styles=CLIP_STYLE, \
+                pictures={"Pictures/chart.wmf": metafile((2, 1))})
+            data_store = os.path.join(tmp_dir, "store", "")
+            self.convert(deck, data_store, 1)
+            with open(data_store + "asset_index.json") as index_file:
+                asset_index = json.load(index_file)
+            self.assertEqual([entry["image"] for entry in asset_index.values()], \
+                [[144, 72, "WMF", [72.0, 72.0], False]])
+
+
+    def test_checksum_collision(self):
+        # Members of different decks with the same CRC and size aren't taken for each other
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+            mock.patch("ODPArchive.ODPArchive.checksum", return_value="00000000-100"):
+            data_store = os.path.join(tmp_dir, "store", "")
+            image_urls = []
+            for deck_name, color in [("red.odp", "red"), ("blue.odp", "blue")]:
+                deck = build_deck(os.path.join(tmp_dir, deck_name), \
+                    [FRAME.format("photo.png")], \
+                    pictures={"Pictures/photo.png": picture((20, 20), color)})
+                self.convert(deck, data_store, 1)
+                with ODPPresentation(deck, data_store) as pres:
+                    image_urls.append(pres.assets.asset_url("Pictures/photo.png"))
+            self.assertNotEqual(image_urls[0], image_urls[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
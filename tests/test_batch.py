@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+from deck_builder import build_deck
+from ODPBatch import BatchConverter
+
+SHAPE = '<draw:polygon draw:style-name="standard" svg:width="4cm" svg:height="3cm" ' \
+    'svg:x="{0}cm" svg:y="1cm" svg:viewBox="0 0 4000 3000" draw:points="0,0 4000,0 4000,3000"/>'
+
+class BatchConverterTest(unittest.TestCase):
+
+    def convert_all(self, output_dir, paths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with BatchConverter(output_dir) as batch:
+                return batch.convert_all(paths)
+
+
+    def test_decks_with_same_name(self):
+        # Decks with the same file name in different directories have separate outputs, and
+        #  are only skipped if their own output is up to date
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck_dir = os.path.join(tmp_dir, "decks")
+            output_dir = os.path.join(tmp_dir, "out")
+            for year, shape_x in [("2024", 1), ("2025", 7)]:
+                os.makedirs(os.path.join(deck_dir, year))
+                build_deck(os.path.join(deck_dir, year, "service.odp"), [SHAPE.format(shape_x)])
+            results = self.convert_all(output_dir, [deck_dir])
+            self.assertEqual([result.status for result in results], ["converted", "converted"])
+            outputs = []
+            for year in ["2024", "2025"]:
+                with open(os.path.join(output_dir, year, "service.html")) as html_file:
+                    outputs.append(html_file.read())
+            self.assertNotEqual(outputs[0], outputs[1])
+
+            # Only the changed deck is converted again
+            changed_deck = build_deck(os.path.join(deck_dir, "2025", "service.odp"), \
+                [SHAPE.format(13)])
+            os.utime(changed_deck, (time.time() + 10, time.time() + 10))
+            results = self.convert_all(output_dir, [deck_dir])
+            self.assertEqual([result.status for result in results], ["skipped", "converted"])
+
+
+    def test_separate_decks_with_same_name(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            decks = []
+            for year in ["2024", "2025"]:
+                os.makedirs(os.path.join(tmp_dir, year))
+                decks.append(build_deck(os.path.join(tmp_dir, year, "service.odp"), \
+                    [SHAPE.format(1)]))
+            with self.assertRaises(ValueError):
+                self.convert_all(os.path.join(tmp_dir, "out"), decks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import unittest
+from collections import OrderedDict
+from unittest import mock
+from EquationCompiler import EquationCompiler
+from ShapeParser import ShapeParser
+
+class GeometryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = (ShapeParser.geometries, ShapeParser.max_geometries, \
+            EquationCompiler.compiled, EquationCompiler.max_equation_sets)
+        ShapeParser.geometries, ShapeParser.max_geometries = OrderedDict(), 2
+        EquationCompiler.compiled, EquationCompiler.max_equation_sets = OrderedDict(), 2
+
+
+    def tearDown(self):
+        ShapeParser.geometries, ShapeParser.max_geometries, \
+            EquationCompiler.compiled, EquationCompiler.max_equation_sets = self.saved
+
+
+    def test_equation_sets_are_bounded(self):
+        # The least recently used equation set is dropped once the cache is full
+        first = EquationCompiler.compile("ellipse", ["$0/2"])
+        EquationCompiler.compile("ellipse", ["$1/2"])
+        self.assertIs(EquationCompiler.compile("ellipse", ["$0/2"]), first)
+        EquationCompiler.compile("ellipse", ["$0/3"])
+        self.assertEqual(list(EquationCompiler.compiled), \
+            [("ellipse", ("$0/2",)), ("ellipse", ("$0/3",))])
+
+
+    def test_geometries_are_bounded(self):
+        with mock.patch.object(ShapeParser, "shape_geometry", \
+            side_effect=lambda geom, vb_bounds, adjs: object()):
+            first = ShapeParser.cached_geometry("a", None, None, None)
+            ShapeParser.cached_geometry("b", None, None, None)
+            self.assertIs(ShapeParser.cached_geometry("a", None, None, None), first)
+            ShapeParser.cached_geometry("c", None, None, None)
+        self.assertEqual(list(ShapeParser.geometries), ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+import unittest
+from lxml import etree
+from deck_builder import build_deck
+from ODPPresentation import ODPPresentation
+
+HATCH = '<draw:hatch draw:name="H1" draw:style="triple" draw:color="#3465a4" ' \
+    'draw:distance="0.2cm" draw:rotation="300"/>'
+HATCH_STYLE = '<style:style style:name="gr1" style:family="graphic" ' \
+    'style:parent-style-name="standard"><style:graphic-properties draw:fill="hatch" ' \
+    'draw:fill-hatch-name="H1" draw:fill-hatch-solid="false"/></style:style>'
+# The polygon is drawn in its viewBox's units, scaled to 5cm x 4cm
+POLYGON = '<draw:polygon draw:style-name="gr1" svg:width="5cm" svg:height="4cm" svg:x="18cm" ' \
+    'svg:y="1cm" svg:viewBox="0 0 5000 4000" draw:points="0,0 5000,0 2500,4000"/>'
+
+class HatchFillTest(unittest.TestCase):
+
+    def test_triple_hatch_covers_polygon_viewbox(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck = build_deck(os.path.join(tmp_dir, "deck.odp"), [POLYGON], \
+                automatic_styles=HATCH_STYLE, styles=HATCH)
+            html_file = os.path.join(tmp_dir, "out.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                with ODPPresentation(deck, os.path.join(tmp_dir, "store", "")) as pres:
+                    pres.parse(html_file, os.path.join(tmp_dir, "out.json"))
+            html_root = etree.parse(html_file, etree.HTMLParser())
+            polygon = html_root.xpath('//g[@id="page_0"]//path')[0]
+            pattern_id = re.match(r'url\(#([^)]*)\)', polygon.get("fill")).group(1)
+            pattern = html_root.xpath('//pattern[@id="' + pattern_id + '"]')[0]
+            # The overlaid tilings cover the polygon in its own (viewBox) user space, rather
+            #  than repeating with seams every page width
+            self.assertEqual((float(pattern.get("width")), float(pattern.get("height"))), \
+                (5000.0, 4000.0))
+            self.assertEqual([float(rect.get("width")) for rect in pattern.iter("rect")], \
+                [5000.0, 5000.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image, ImageCms
+from deck_builder import build_deck, metafile
+from AssetStore import AssetStore, DPCM
+from ODPArchive import ODPArchive
+
+def rotated_photo():
+    # 200x100 JPEG, red on the left and blue on the right, to be turned a quarter turn
+    #  clockwise (EXIF orientation 6) - upright it is 100x200, red at the top
+    photo = Image.new("RGB", (200, 100), "blue")
+    photo.paste(Image.new("RGB", (100, 100), "red"), (0, 0))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    photo_data = io.BytesIO()
+    photo.save(photo_data, "JPEG", exif=exif.tobytes(), icc_profile=icc_profile, quality=95)
+    return photo_data.getvalue(), icc_profile
+
+def palette_picture():
+    # 64x64 palette PNG with a transparent colour
+    logo = Image.new("P", (64, 64), 1)
+    logo.putpalette([255, 255, 255, 255, 0, 0])
+    logo_data = io.BytesIO()
+    logo.save(logo_data, "PNG", transparency=0)
+    return logo_data.getvalue()
+
+class ImageDerivativeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        photo_data, self.icc_profile = rotated_photo()
+        deck = build_deck(os.path.join(self.tmp_dir.name, "deck.odp"), [], \
+            pictures={"Pictures/photo.jpg": photo_data, "Pictures/chart.wmf": metafile((2, 1)), \
+            "Pictures/logo.png": palette_picture(), "Pictures/diagram.svg": b"<svg/>"}, \
+            media_types={"Pictures/photo.jpg": "image/jpeg", \
+            "Pictures/diagram.svg": "image/svg+xml"})
+        self.archive = ODPArchive(deck)
+        self.assets = AssetStore(self.archive, os.path.join(self.tmp_dir.name, "store", ""), \
+            image_dpi=1000)
+
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp_dir.cleanup()
+
+
+    def test_rotated_image_info(self):
+        image_info = self.assets.image_info("Pictures/photo.jpg")
+        self.assertEqual((image_info.width, image_info.height), (100, 200))
+
+
+    def test_rotated_derivative(self):
+        # Displayed at 1.27mm x 2.54mm, i.e. 50x100 pixels at 1000 dpi
+        derivative_url = self.assets.image_url("Pictures/photo.jpg", (0.127, 0.254))
+        with Image.open(derivative_url) as derivative:
+            self.assertEqual(derivative.size, (50, 100))
+            self.assertEqual(derivative.info.get("icc_profile"), self.icc_profile)
+            derivative = derivative.convert("RGB")
+            self.assertGreater(derivative.getpixel((25, 10))[0], 200)
+            self.assertGreater(derivative.getpixel((25, 90))[2], 200)
+
+
+    def test_rotated_crop(self):
+        # Cropping the bottom half of the upright image leaves only the red half
+        half_height = 100 / DPCM
+        derivative_url = self.assets.image_url("Pictures/photo.jpg", (2, 2), \
+            [0, 0, half_height, 0])
+        with Image.open(derivative_url) as derivative:
+            self.assertEqual(derivative.size, (100, 100))
+            derivative = derivative.convert("RGB")
+            for pixel in [(10, 10), (50, 50), (90, 90)]:
+                red, _, blue = derivative.getpixel(pixel)
+                self.assertGreater(red, 200)
+                self.assertLess(blue, 60)
+
+
+    def test_metafile_is_not_resized(self):
+        # The original metafile is used, as PIL can't draw it
+        self.assertIsNone(self.assets.image_url("Pictures/chart.wmf", (0.1, 0.1)))
+        self.assertEqual(self.assets.image_info("Pictures/chart.wmf").width, 144)
+
+
+    def test_palette_image_as_jpeg(self):
+        assets = AssetStore(self.archive, os.path.join(self.tmp_dir.name, "store", ""), \
+            image_dpi=254, image_format="jpeg")
+        with Image.open(assets.image_url("Pictures/logo.png", (0.32, 0.32))) as derivative:
+            self.assertEqual((derivative.format, derivative.mode, derivative.size), \
+                ("JPEG", "RGB", (32, 32)))
+
+
+    def test_vector_media_type(self):
+        # Images the manifest gives a vector media type aren't opened with PIL
+        with mock.patch("AssetStore.Image.open", side_effect=AssertionError):
+            self.assertIsNone(self.assets.image_url("Pictures/diagram.svg", (0.1, 0.1)))
+        self.assertEqual(self.archive.media_type("Pictures/photo.jpg"), "image/jpeg")
+        self.assertIsNone(self.archive.media_type("Pictures/logo.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from deck_builder import build_deck, picture
+from ODPPresentation import ODPPresentation
+from PageCache import PageCache
+
+FRAME = '<draw:frame draw:style-name="standard" svg:width="1cm" svg:height="1cm" svg:x="1cm" ' \
+    'svg:y="1cm"><draw:image xlink:href="Pictures/photo.png"/></draw:frame>'
+
+class PageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.deck = build_deck(os.path.join(self.tmp_dir.name, "deck.odp"), [FRAME], \
+            pictures={"Pictures/photo.png": picture((200, 200), "red")})
+        self.data_store = os.path.join(self.tmp_dir.name, "store", "")
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def convert(self):
+        out_dir = self.tmp_dir.name
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ODPPresentation(self.deck, self.data_store, image_dpi=254) as pres:
+                pres.parse(os.path.join(out_dir, "out.html"), os.path.join(out_dir, "out.json"), \
+                    incremental=True)
+
+
+    def derivatives(self):
+        # The 200x200 image is displayed 1cm square, i.e. 100x100 pixels at 254 dpi
+        return [file_name for file_name in os.listdir(self.data_store) \
+            if "_100x100" in file_name]
+
+
+    def test_missing_derivative_is_rendered(self):
+        # A cached page isn't reused if an image derivative it uses has been deleted
+        self.convert()
+        derivatives = self.derivatives()
+        self.assertEqual(len(derivatives), 1)
+        os.remove(self.data_store + derivatives[0])
+        self.convert()
+        self.assertEqual(self.derivatives(), derivatives)
+
+
+    def test_fonts_are_fingerprinted(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ODPPresentation(self.deck, self.data_store) as pres:
+                page = next(pres.iter_pages())
+                fingerprint = PageCache.fingerprint(pres, page, 0)
+                pres.font_index.key = "other fonts"
+                try:
+                    self.assertNotEqual(PageCache.fingerprint(pres, page, 0), fingerprint)
+                finally:
+                    pres.font_index.key = None
+
+
+if __name__ == "__main__":
+    unittest.main()
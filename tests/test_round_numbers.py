@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import os
+import re
+import tempfile
+import unittest
+from lxml import etree
+from deck_builder import build_deck
+from ODPFunctions import round_numbers
+from ODPPresentation import ODPPresentation
+
+# Drawn in its viewBox's units, scaled by 0.001 to 5cm x 4cm
+POLYGON = '<draw:polygon draw:style-name="standard" svg:width="5cm" svg:height="4cm" ' \
+    'svg:x="15cm" svg:y="8cm" svg:viewBox="0 0 5000 4000" draw:points="0,0 5000,0 2500,4000"/>'
+
+class RoundNumbersTest(unittest.TestCase):
+
+    def test_numeric_attributes_are_rounded(self):
+        self.assertEqual(round_numbers('<rect x="1.23456" height="2.0000001" ' \
+            'transform="translate(0.33333,2e-7)" style="stroke-width:0.026458cm"/>', 2), \
+            '<rect x="1.23" height="2" transform="translate(0.33,0)" ' \
+            'style="stroke-width:0.026458cm"/>')
+
+    def test_factors_keep_significant_digits(self):
+        # Scale and matrix factors, and stroke widths, can be smaller than the precision
+        self.assertEqual(round_numbers('<path transform="translate(15.123,8) ' \
+            'scale(0.0010000003) matrix(0.70710678,0.5,-0.5,0.70710678,1.2345,2.3456)" ' \
+            'stroke-width="0.0264583"/>', 1), '<path transform="translate(15.1,8) ' \
+            'scale(0.001) matrix(0.7071,0.5,-0.5,0.7071,1.2,2.3)" stroke-width="0.02646"/>')
+
+    def test_polygon_is_scaled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deck = build_deck(os.path.join(tmp_dir, "deck.odp"), [POLYGON])
+            html_file = os.path.join(tmp_dir, "out.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                with ODPPresentation(deck, os.path.join(tmp_dir, "store", ""), 2) as pres:
+                    pres.parse(html_file, os.path.join(tmp_dir, "out.json"))
+            html_root = etree.parse(html_file, etree.HTMLParser())
+            polygon = html_root.xpath('//g[@id="page_0"]//path')[0]
+            scale = re.search(r'scale\(([^)]*)\)', polygon.get("transform")).group(1)
+            self.assertAlmostEqual(float(scale), 0.001)
+            self.assertGreater(float(polygon.get("stroke-width")), 1)
+
+    def test_hash_named_href_is_unchanged(self):
+        # Content hashes can start with digits, e and a digit - the form of a float exponent
+        image = '<image xlink:href="./store/3e7b9c0d5f21a8e4.png" x="0.123456"/>'
+        self.assertEqual(round_numbers(image, 3), \
+            '<image xlink:href="./store/3e7b9c0d5f21a8e4.png" x="0.123"/>')
+
+    def test_href_path_and_id_are_unchanged(self):
+        image = '<image id="img1.25" xlink:href="/srv/v/1.25/store/a.png"/>'
+        self.assertEqual(round_numbers(image, 1), image)
+
+    def test_text_is_unchanged(self):
+        text = '<text x="1.0">1.23456 x="1.5555"</text>'
+        self.assertEqual(round_numbers(text, 2), '<text x="1">1.23456 x="1.5555"</text>')
+
+    def test_no_precision(self):
+        self.assertEqual(round_numbers('<rect x="1.23456"/>', None), '<rect x="1.23456"/>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103 # Snake-case naming convention
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from deck_builder import build_deck
+from ODPPresentation import ODPPresentation
+from ShapeParser import ShapeParser
+
+class ShareShapesTest(unittest.TestCase):
+
+    def test_symbol_counted_once(self):
+        # Geometries under different keys can give identical symbols, which are only defined
+        #  (and only cost bytes) once
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+            contextlib.redirect_stdout(io.StringIO()):
+            deck = build_deck(os.path.join(tmp_dir, "deck.odp"), [""])
+            with ODPPresentation(deck, os.path.join(tmp_dir, "store", "")) as pres, \
+                mock.patch.object(ShapeParser, "place_geometry", \
+                side_effect=lambda geometry, path, scales, bases: path.push("M0 0L10 10")):
+                layer = pres.dwg.g()
+                path_bytes = 0
+                for geometry in [object(), object()]:
+                    for bases in [(1, 1), (2, 2)]:
+                        shape_path = pres.dwg.path(d="M1 1L11 11", fill="red")
+                        layer.add(shape_path)
+                        path_bytes += len(shape_path.tostring())
+                        pres.shape_instances.setdefault((geometry, (1, 1)), []).append( \
+                            (layer, shape_path, bases))
+                saved_bytes = ShapeParser.share_shapes(pres)
+                symbols = pres.dwg.defs.elements
+                self.assertEqual(len(symbols), 1)
+                self.assertEqual(saved_bytes, path_bytes - len(symbols[0].tostring()) - \
+                    sum(len(use.tostring()) for use in layer.elements))
+
+
+if __name__ == "__main__":
+    unittest.main()